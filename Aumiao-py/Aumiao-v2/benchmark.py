@@ -0,0 +1,336 @@
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import src
+import src.app.cassette as Cassette
+import src.app.codec as Codec
+
+try:
+    import orjson
+except ModuleNotFoundError:
+    orjson = None
+
+
+# 生成与作品评论接口结构相同的分页数据
+def make_comments_page(count: int) -> bytes:
+    items = [
+        {
+            "id": 100000 + i,
+            "content": "".join(
+                random.choice("编程猫作品好厉害加油666abc") for _ in range(40)
+            ),
+            "created_at": 1720000000 + i,
+            "n_likes": random.randint(0, 500),
+            "is_top": False,
+            "user": {
+                "id": str(random.randint(1, 10**8)),
+                "nickname": f"用户{i}",
+                "avatar_url": f"https://cdn.codemao.cn/avatar/{i}.png",
+            },
+            "replies": {"total": 0, "items": []},
+        }
+        for i in range(count)
+    ]
+    return json.dumps(
+        {"items": items, "offset": 0, "limit": count, "page_total": count * 20},
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+
+def timeit(func: Callable, payload, rounds: int) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(payload)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+# 对比标准库json与orjson的编解码耗时, payloads为录制的响应体
+def bench_codec(payloads: Dict[str, bytes], rounds: int) -> None:
+    decoders = {"json": json.loads}
+    encoders = {"json": lambda obj: json.dumps(obj, ensure_ascii=False).encode()}
+    if orjson is not None:
+        decoders["orjson"] = orjson.loads
+        encoders["orjson"] = orjson.dumps
+    print(f"当前使用的编解码器: {Codec.BACKEND}")
+    for name, payload in payloads.items():
+        obj = json.loads(payload)
+        print(f"{name} ({len(payload) / 1024:.1f} KiB)")
+        for backend in decoders:
+            decode = timeit(decoders[backend], payload, rounds)
+            encode = timeit(encoders[backend], obj, rounds)
+            print(f"  {backend:<8} 解码 {decode:8.3f} ms  编码 {encode:8.3f} ms")
+
+
+# 可录制/回放的场景, target为作品id或用户id
+SCENARIOS: Dict[str, Callable[[str], object]] = {
+    "comments": lambda target: src.client_work_obtain.get_work_comments(target),
+    "works": lambda target: src.client_user_obtain.get_user_works(target),
+    "clear_ad": lambda target: src.client_union_work.clear_ad(
+        src.app_data.USER_DATA["ads"]
+    ),
+    "inbox": lambda target: src.client_community_obtain.get_replies(),
+}
+
+
+# 关闭缓存与限速, 让回放耗时只取决于模拟的网络延迟
+def isolate() -> None:
+    src.app_acquire.cache.CACHE["ttl"] = {}
+    src.app_acquire.cache.clear()
+    for group in src.app_acquire.limiter.RATE_LIMIT:
+        src.app_acquire.limiter.RATE_LIMIT[group] = {"rate": 1e6, "burst": 1e6}
+    src.app_acquire.limiter.buckets.clear()
+    # 录制与回放都不试探每页上限, 请求参数与录音一致
+    src.app_acquire.page_size.PAGE_SIZE["enabled"] = False
+
+
+def record(path: str, scenario: str, target: str) -> None:
+    src.app_acquire.page_size.PAGE_SIZE["enabled"] = False
+    adapter = Cassette.CassetteAdapter(path, mode="record")
+    src.app_acquire.session.mount(adapter)
+    try:
+        SCENARIOS[scenario](target)
+    finally:
+        src.app_acquire.session.mount(None)
+        adapter.save()
+    print(f"已录制{len(adapter.records)}个请求到 {path}")
+
+
+def replay(
+    path: str, scenario: str, target: str, rounds: int, latency: float, jitter: float
+) -> None:
+    isolate()
+    src.app_acquire.session.mount(
+        Cassette.CassetteAdapter(path, latency=latency, jitter=jitter)
+    )
+    metrics = src.app_acquire.metrics
+    timings = []
+    for _ in range(rounds):
+        metrics.reset()
+        start = time.perf_counter()
+        SCENARIOS[scenario](target)
+        timings.append(time.perf_counter() - start)
+    requests = sum(item["requests"] for item in metrics.snapshot().values())
+    timings.sort()
+    print(f"{scenario}: {rounds}轮, 每轮{requests}个请求")
+    print(
+        f"  耗时 最小 {timings[0]:.3f}s  中位 {timings[len(timings) // 2]:.3f}s"
+        f"  最大 {timings[-1]:.3f}s"
+    )
+
+
+# 对比冷启动与预热后首个请求的耗时, 每轮开始前关闭会话并清空DNS缓存
+def warmup(path: str, rounds: int) -> None:
+    isolate()
+    client = src.app_acquire
+    session = client.session
+    base = client.BASE_URL
+    timings = {"cold": [], "warm": []}
+    # DNS缓存默认关闭, 对比期间临时开启, 预热时的解析结果才能留给首个请求
+    installed = session.dns.resolve is not None
+    if not installed:
+        session.dns.ttl = 300
+        session.dns.install()
+    try:
+        for _ in range(rounds):
+            for mode in timings:
+                session.close()
+                session.dns.clear()
+                resolve_time = session.dns.stats()["resolve_time"]
+                warmed = session.warm_up([base])[base] if mode == "warm" else {}
+                start = time.perf_counter()
+                client.send_request(path, "get")
+                timings[mode].append(
+                    {
+                        "first": time.perf_counter() - start,
+                        "dns": session.dns.stats()["resolve_time"] - resolve_time,
+                        "warm_up": warmed.get("total", 0.0),
+                    }
+                )
+    finally:
+        if not installed:
+            session.dns.uninstall()
+    print(f"{base}{path}: {rounds}轮")
+    for mode, samples in timings.items():
+        average = {
+            key: sum(sample[key] for sample in samples) / len(samples)
+            for key in samples[0]
+        }
+        print(
+            f"  {mode}: 首个请求 {average['first'] * 1000:.1f}ms"
+            f"  DNS {average['dns'] * 1000:.1f}ms"
+            f"  预热 {average['warm_up'] * 1000:.1f}ms"
+        )
+
+
+# 对比HTTP/1.1与HTTP/2下并发分页请求的耗时
+# 标准库的模拟接口只支持HTTP/1.1, HTTP/2需另外启动: python mock.py --http2 --port 8521
+def http2(h1: str, h2: str, pages: int, limit: int, concurrency: int) -> None:
+    isolate()
+    client = src.app_acquire
+    client_async = src.app_acquire_async
+    path = "/creation-tools/v1/works/1/comments"
+
+    def fetch(page: int) -> None:
+        client.send_request(
+            path, "get", params={"limit": limit, "offset": page * limit}
+        )
+
+    async def fetch_async() -> None:
+        await client_async.fetch_all_data(
+            path,
+            {"limit": limit, "offset": 0},
+            total_key="page_total",
+            data_key="items",
+        )
+        await client_async.close()
+
+    for name, target, enabled in (("HTTP/1.1", h1, False), ("HTTP/2", h2, True)):
+        client.BASE_URL = client_async.BASE_URL = target
+        client.session.HTTP2["prior_knowledge"] = target.startswith("http://")
+        client.session.configure(http2=enabled)
+        client.metrics.reset()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(fetch, range(pages)))
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        asyncio.run(fetch_async())
+        elapsed_async = time.perf_counter() - start
+        print(
+            f"{name}: {concurrency}线程{pages}页 {elapsed:.3f}s"
+            f"  协程全部分页 {elapsed_async:.3f}s"
+        )
+    client.session.configure(http2=False)
+
+
+# 各翻页场景, 用于统计每1000条数据所需的请求数
+PAGING_SCENARIOS: Dict[str, Callable[[], list]] = {
+    "comments": lambda: src.client_work_obtain.get_work_comments(1),
+    "works": lambda: src.client_user_obtain.get_user_works("1"),
+    "fans": lambda: src.client_user_obtain.get_user_fans("1"),
+    "follows": lambda: src.client_user_obtain.get_user_follows("1"),
+    "shops": lambda: src.client_shop_obtain.get_shops(),
+    "members": lambda: src.client_shop_obtain.get_shops_members(1),
+    "replies": lambda: src.client_post_obtain.get_post_replies(1),
+}
+
+
+# 对比固定每页数量、首次试探每页上限与使用已记录上限时, 每1000条数据所需的请求数
+# 试探到的上限写入临时的状态文件, 不改动data/page_limits.json, 配置中手动指定的上限不参与对比
+def page_size(target: str) -> None:
+    isolate()
+    for obtain in (
+        src.client_work_obtain,
+        src.client_user_obtain,
+        src.client_shop_obtain,
+        src.client_post_obtain,
+    ):
+        obtain.acquire.BASE_URL = target
+    metrics = src.app_acquire.metrics
+    paging = src.app_acquire.page_size
+    config = paging.PAGE_SIZE
+    pinned, config["limits"] = config["limits"], {}
+    path, learned = paging.path, paging.learned
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as file:
+        paging.path = file.name
+    modes = {"固定": False, "试探": True, "已知": True}
+    print(f"{'场景':<10}" + "".join(f"{mode:>10}" for mode in modes) + "  上限")
+    try:
+        for name, scenario in PAGING_SCENARIOS.items():
+            paging.learned = {}
+            line = f"{name:<10}"
+            for enabled in modes.values():
+                config["enabled"] = enabled
+                metrics.reset()
+                items = len(scenario())
+                requests = sum(
+                    endpoint["requests"] for endpoint in metrics.snapshot().values()
+                )
+                line += f"{requests * 1000 / max(items, 1):>12.1f}"
+            print(line + f"  {paging.learned}")
+    finally:
+        config["limits"] = pinned
+        paging.path, paging.learned = path, learned
+        os.remove(file.name)
+
+
+def load_payloads(paths: List[str]) -> Dict[str, bytes]:
+    if not paths:
+        random.seed(0)
+        return {
+            "comments limit=15": make_comments_page(15),
+            "comments limit=200": make_comments_page(200),
+        }
+    payloads = {}
+    for path in paths:
+        # 录像带中的每个响应体都作为一份数据
+        if path.endswith(".gz"):
+            with gzip.open(path, "rb") as file:
+                for index, line in enumerate(file):
+                    record = Codec.decode(line)
+                    if "text" in record and record["text"][:1] in "{[":
+                        payloads[f"{record['key']} #{index}"] = record["text"].encode()
+            continue
+        with open(path, "rb") as file:
+            payloads[path] = file.read()
+    return payloads
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aumiao 性能测试")
+    commands = parser.add_subparsers(dest="command", required=True)
+    codec = commands.add_parser("codec", help="JSON编解码耗时对比")
+    codec.add_argument(
+        "payloads", nargs="*", help="响应体文件或录像带(.gz), 不填则使用生成的数据"
+    )
+    codec.add_argument("--rounds", type=int, default=200)
+    record_parser = commands.add_parser("record", help="录制场景的请求")
+    replay_parser = commands.add_parser("replay", help="离线回放场景")
+    for command in (record_parser, replay_parser):
+        command.add_argument("cassette", help="录像带路径(.jsonl.gz)")
+        command.add_argument("scenario", choices=SCENARIOS)
+        command.add_argument("--target", default=src.app_data.ACCOUNT_DATA["id"])
+    replay_parser.add_argument("--rounds", type=int, default=5)
+    replay_parser.add_argument("--latency", type=float, default=0.05)
+    replay_parser.add_argument("--jitter", type=float, default=0.01)
+    warmup_parser = commands.add_parser("warmup", help="冷启动与预热后的首个请求耗时")
+    warmup_parser.add_argument("--path", default="/coconut/clouddb/currentTime")
+    warmup_parser.add_argument("--rounds", type=int, default=5)
+    http2_parser = commands.add_parser("http2", help="HTTP/1.1与HTTP/2并发分页对比")
+    http2_parser.add_argument("--h1", default="http://127.0.0.1:8520")
+    http2_parser.add_argument("--h2", default="http://127.0.0.1:8521")
+    http2_parser.add_argument("--pages", type=int, default=200)
+    http2_parser.add_argument("--limit", type=int, default=20)
+    http2_parser.add_argument("--concurrency", type=int, default=16)
+    page_size_parser = commands.add_parser(
+        "page-size", help="每1000条数据所需的请求数(固定每页数量/自动探测上限)"
+    )
+    page_size_parser.add_argument("--target", default="http://127.0.0.1:8520")
+    options = parser.parse_args()
+    if options.command == "codec":
+        bench_codec(load_payloads(options.payloads), options.rounds)
+    elif options.command == "record":
+        record(options.cassette, options.scenario, options.target)
+    elif options.command == "replay":
+        replay(
+            options.cassette,
+            options.scenario,
+            options.target,
+            options.rounds,
+            options.latency,
+            options.jitter,
+        )
+    elif options.command == "warmup":
+        warmup(options.path, options.rounds)
+    elif options.command == "http2":
+        http2(options.h1, options.h2, options.pages, options.limit, options.concurrency)
+    elif options.command == "page-size":
+        page_size(options.target)
@@ -0,0 +1,507 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+# h2库随httpx[http2]安装, 只有--http2模式需要
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+    import h2.exceptions
+except ModuleNotFoundError:
+    h2 = None
+
+import src.app.codec as Codec
+
+ADS = ["互赞", "点个关注", "cpdd", "看看我的作品", "家族招人"]
+WORDS = ["666", "加油", "针不戳", "前排", "沙发", "不错不错", "好厉害", "求赞"]
+
+
+# 本地模拟的编程猫接口, 数据按id和序号即时生成, 不占用内存, 因此可以模拟任意规模
+class MockData:
+    def __init__(self, options: argparse.Namespace) -> None:
+        self.options = options
+
+    def rng(self, *keys) -> random.Random:
+        return random.Random(f"{self.options.seed}:{keys}")
+
+    def user(self, user_id: int) -> Dict:
+        rng = self.rng("user", user_id)
+        return {
+            "id": str(user_id),
+            "nickname": f"用户{user_id}",
+            "avatar_url": f"https://cdn.codemao.cn/avatar/{user_id}.png",
+            "description": "".join(rng.choices(WORDS, k=3)),
+            "author_level": rng.randint(1, 6),
+            "fans_total": self.options.fans,
+            "collected_total": rng.randint(0, 10**5),
+            "liked_total": rng.randint(0, 10**6),
+            "view_times": rng.randint(0, 10**7),
+        }
+
+    def work(self, work_id: int) -> Dict:
+        rng = self.rng("work", work_id)
+        return {
+            "id": work_id,
+            "work_name": f"作品{work_id}",
+            "preview": f"https://cdn.codemao.cn/work/{work_id}.png",
+            "view_times": rng.randint(0, 10**6),
+            "praise_times": rng.randint(0, 10**4),
+            "collect_times": rng.randint(0, 10**4),
+            "comment_times": self.options.comments,
+            "user_id": str(rng.randint(1, 10**8)),
+        }
+
+    def comment(self, work_id: int, index: int) -> Dict:
+        rng = self.rng("comment", work_id, index)
+        words = rng.choices(WORDS, k=rng.randint(1, 6))
+        if rng.random() < self.options.ad_rate:
+            words.append(rng.choice(ADS))
+        return {
+            "id": work_id * 10**7 + index,
+            "content": "".join(words),
+            "created_at": 1700000000 - index * 60,
+            "n_likes": rng.randint(0, 100),
+            "is_top": index == 0 and rng.random() < 0.1,
+            "user": self.user(rng.randint(1, 10**8)),
+            "replies": {"total": 0, "items": []},
+        }
+
+    def reply(self, index: int) -> Dict:
+        rng = self.rng("reply", index)
+        return {
+            "id": index,
+            "type": "COMMENT_REPLY",
+            "content": {
+                "sender": self.user(rng.randint(1, 10**8)),
+                "message": {"reply": "".join(rng.choices(WORDS, k=3))},
+            },
+            "created_at": 1700000000 - index * 60,
+        }
+
+    def post(self, post_id: int) -> Dict:
+        rng = self.rng("post", post_id)
+        return {
+            "id": str(post_id),
+            "title": f"帖子{post_id}",
+            "content": "".join(rng.choices(WORDS, k=20)),
+            "user": self.user(rng.randint(1, 10**8)),
+            "n_replies": self.options.replies,
+            "created_at": 1700000000 - post_id,
+        }
+
+    def shop(self, shop_id: int) -> Dict:
+        return {
+            "id": shop_id,
+            "name": f"工作室{shop_id}",
+            "level": 4,
+            "total_works": 100,
+            "n_members": self.options.members,
+        }
+
+
+# 按offset/limit或page/limit切出一页
+def paginate(
+    query: Dict[str, str], total: int, build: Callable[[int], Dict], max_limit: int
+) -> Tuple[List[Dict], int, int]:
+    limit = min(int(query.get("limit", 15)), max_limit)
+    if "page" in query:
+        offset = (int(query["page"]) - 1) * limit
+    else:
+        offset = int(query.get("offset", 0))
+    items = [build(index) for index in range(offset, min(offset + limit, total))]
+    return items, offset, limit
+
+
+# 与协议无关的接口逻辑: 限流、随机错误、路由、ETag与gzip
+class MockAPI:
+    def __init__(self, options: argparse.Namespace) -> None:
+        self.options = options
+        self.data = MockData(options)
+        self.tokens = float(options.rate or 0)
+        self.updated = time.monotonic()
+        self.active = 0
+        self.lock = threading.Lock()
+
+    # 本次请求模拟的网络延迟(秒), 同时处理的请求超过capacity时按比例变慢
+    def delay(self) -> float:
+        delay = self.options.latency + random.uniform(-1, 1) * self.options.jitter
+        capacity = self.options.capacity
+        if capacity and self.active > capacity:
+            delay *= self.active / capacity
+        return max(delay, 0)
+
+    def enter(self) -> None:
+        with self.lock:
+            self.active += 1
+
+    def leave(self) -> None:
+        with self.lock:
+            self.active -= 1
+
+    # 服务端令牌桶, 超过rate时返回429, 返回值为Retry-After(秒), 未限流返回None
+    def take_token(self) -> Optional[str]:
+        rate = self.options.rate
+        if not rate:
+            return None
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(rate, self.tokens + (now - self.updated) * rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return None
+            return f"{(1 - self.tokens) / rate:.3f}"
+
+    # 处理一个请求, headers的键为小写, 返回(状态码, 响应头, 响应体)
+    def respond(
+        self, method: str, path: str, headers: Dict[str, str]
+    ) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        if method == "HEAD":
+            # 连接预热使用HEAD请求, 只返回响应头
+            return 200, [], b""
+        wait = self.take_token()
+        if wait:
+            return self.encode(
+                headers, 429, {"error": "too many requests"}, [("Retry-After", wait)]
+            )
+        if random.random() < self.options.error_rate:
+            return self.encode(headers, 500, {"error": "internal error"})
+        url = urlparse(path)
+        query = {key: value[0] for key, value in parse_qs(url.query).items()}
+        for pattern, route_method, handler in ROUTES:
+            match = re.fullmatch(pattern, url.path)
+            if match and route_method == method:
+                status, body = handler(self.data, query, *match.groups())
+                return self.encode(headers, status, body)
+        return self.encode(headers, 404, {"error": "not found"})
+
+    def encode(
+        self,
+        headers: Dict[str, str],
+        status: int,
+        body,
+        extra: Optional[List[Tuple[str, str]]] = None,
+    ) -> Tuple[int, List[Tuple[str, str]], bytes]:
+        content = Codec.encode(body) if body is not None else b""
+        etag = f'"{hashlib.md5(content).hexdigest()}"'
+        if status == 200 and headers.get("if-none-match") == etag:
+            status, content = 304, b""
+        response = [("Content-Type", "application/json;charset=UTF-8")]
+        # 客户端接受gzip且响应体足够大时压缩
+        min_size = self.options.gzip_min_size
+        if 0 <= min_size <= len(content) and "gzip" in headers.get(
+            "accept-encoding", ""
+        ):
+            content = gzip.compress(content, compresslevel=5)
+            response += [("Content-Encoding", "gzip"), ("Vary", "Accept-Encoding")]
+        if status in (200, 304):
+            response.append(("ETag", etag))
+        return status, response + (extra or []), content
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # 响应头与响应体合并发送, 避免长连接上Nagle算法与延迟确认叠加造成的额外等待
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    server: "MockServer"
+
+    def log_message(self, format: str, *args) -> None:
+        if self.server.api.options.verbose:
+            super().log_message(format, *args)
+
+    def handle_request(self) -> None:
+        api = self.server.api
+        length = int(self.headers.get("Content-Length", 0))
+        if length:
+            self.rfile.read(length)
+        api.enter()
+        try:
+            time.sleep(api.delay())
+            headers = {name.lower(): value for name, value in self.headers.items()}
+            status, response, content = api.respond(self.command, self.path, headers)
+        finally:
+            api.leave()
+        self.send_response(status)
+        for name, value in response:
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(content)
+
+    do_GET = do_HEAD = do_DELETE = do_POST = handle_request
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, api: MockAPI) -> None:
+        super().__init__((api.options.host, api.options.port), MockHandler)
+        self.api = api
+
+
+# HTTP/2(h2c, 不经TLS直接以HTTP/2通信)版本, 所有请求在同一连接上多路复用
+# 标准库只支持HTTP/1.1, 此处借助httpx[http2]依赖的h2库实现
+class MockHTTP2Protocol(asyncio.Protocol):
+    def __init__(self, api: MockAPI) -> None:
+        self.api = api
+        self.connection = h2.connection.H2Connection(
+            config=h2.config.H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        self.requests: Dict[int, Dict[str, str]] = {}
+        self.windows: Dict[int, asyncio.Event] = {}
+
+    def connection_made(self, transport: asyncio.Transport) -> None:
+        self.transport = transport
+        self.connection.initiate_connection()
+        self.transport.write(self.connection.data_to_send())
+
+    def data_received(self, data: bytes) -> None:
+        try:
+            events = self.connection.receive_data(data)
+        except h2.exceptions.ProtocolError:
+            self.transport.write(self.connection.data_to_send())
+            self.transport.close()
+            return
+        for event in events:
+            if isinstance(event, h2.events.RequestReceived):
+                self.requests[event.stream_id] = dict(event.headers)
+            elif isinstance(event, h2.events.DataReceived):
+                self.connection.acknowledge_received_data(
+                    event.flow_controlled_length, event.stream_id
+                )
+            elif isinstance(event, h2.events.StreamEnded):
+                headers = self.requests.pop(event.stream_id, {})
+                asyncio.ensure_future(self.handle(event.stream_id, headers))
+            elif isinstance(event, h2.events.WindowUpdated):
+                for stream_id, window in list(self.windows.items()):
+                    if event.stream_id in (0, stream_id):
+                        window.set()
+            elif isinstance(event, h2.events.StreamReset):
+                self.windows.pop(event.stream_id, asyncio.Event()).set()
+        self.transport.write(self.connection.data_to_send())
+
+    async def handle(self, stream_id: int, headers: Dict[str, str]) -> None:
+        self.api.enter()
+        try:
+            await asyncio.sleep(self.api.delay())
+            status, response, content = self.api.respond(
+                headers.get(":method", "GET"), headers.get(":path", "/"), headers
+            )
+        finally:
+            self.api.leave()
+        self.connection.send_headers(
+            stream_id,
+            [(":status", str(status)), ("content-length", str(len(content)))]
+            + [(name.lower(), value) for name, value in response],
+        )
+        # 按流量控制窗口分块发送, 窗口耗尽时等待对方的WINDOW_UPDATE
+        while content:
+            size = min(
+                self.connection.local_flow_control_window(stream_id),
+                self.connection.max_outbound_frame_size,
+                len(content),
+            )
+            if size <= 0:
+                window = self.windows.setdefault(stream_id, asyncio.Event())
+                window.clear()
+                await window.wait()
+                if stream_id not in self.windows:
+                    return
+                continue
+            self.connection.send_data(stream_id, content[:size])
+            self.transport.write(self.connection.data_to_send())
+            content = content[size:]
+        self.windows.pop(stream_id, None)
+        self.connection.end_stream(stream_id)
+        self.transport.write(self.connection.data_to_send())
+
+
+async def serve_http2(api: MockAPI) -> None:
+    loop = asyncio.get_running_loop()
+    server = await loop.create_server(
+        lambda: MockHTTP2Protocol(api), api.options.host, api.options.port
+    )
+    async with server:
+        await server.serve_forever()
+
+
+def work_comments(data: MockData, query: Dict, work_id: str):
+    total = data.options.comments
+    items, offset, limit = paginate(
+        query, total, lambda i: data.comment(int(work_id), i), data.options.max_limit
+    )
+    return 200, {"items": items, "offset": offset, "limit": limit, "page_total": total}
+
+
+def work_list(data: MockData, query: Dict):
+    user_id = int(query.get("user_id", 1))
+    total = data.options.works
+    items, offset, limit = paginate(
+        query,
+        total,
+        lambda i: data.work(user_id * 1000 + i),
+        data.options.max_limit,
+    )
+    return 200, {"items": items, "offset": offset, "limit": limit, "total": total}
+
+
+def user_list(data: MockData, query: Dict):
+    total = data.options.fans
+    user_id = int(query.get("user_id", 1))
+    items, offset, limit = paginate(
+        query, total, lambda i: data.user(user_id * 10**6 + i), data.options.max_limit
+    )
+    return 200, {"items": items, "offset": offset, "limit": limit, "total": total}
+
+
+def message_count(data: MockData, query: Dict):
+    return 200, [
+        {"query_type": "COMMENT_REPLY", "count": data.options.messages},
+        {"query_type": "LIKE_FORK", "count": 0},
+        {"query_type": "SYSTEM", "count": 0},
+    ]
+
+
+def message_record(data: MockData, query: Dict):
+    total = data.options.messages
+    items, offset, limit = paginate(query, total, data.reply, 200)
+    return 200, {"items": items, "offset": offset, "limit": limit, "total": total}
+
+
+def posts_all(data: MockData, query: Dict):
+    # 超出单次上限的id被忽略
+    ids = [int(item) for item in query.get("ids", "").split(",") if item]
+    ids = ids[: data.options.max_ids]
+    return 200, {"items": [data.post(post_id) for post_id in ids]}
+
+
+def post_replies(data: MockData, query: Dict, post_id: str):
+    total = data.options.replies
+    items, offset, limit = paginate(
+        query,
+        total,
+        lambda i: {**data.reply(int(post_id) * 10**6 + i), "type": "POST_REPLY"},
+        data.options.max_limit,
+    )
+    return 200, {"items": items, "offset": offset, "limit": limit, "total": total}
+
+
+def shop_users(data: MockData, query: Dict, shop_id: str):
+    total = data.options.members
+    items, offset, limit = paginate(
+        query,
+        total,
+        lambda i: data.user(int(shop_id) * 10**4 + i),
+        data.options.max_limit,
+    )
+    return 200, {"items": items, "offset": offset, "limit": limit, "total": total}
+
+
+def shop_search(data: MockData, query: Dict):
+    total = data.options.shops
+    items, offset, limit = paginate(query, total, data.shop, data.options.max_limit)
+    return 200, {"items": items, "offset": offset, "limit": limit, "total": total}
+
+
+def user_honor(data: MockData, query: Dict):
+    user = data.user(int(query.get("user_id", 1)))
+    return 200, {**user, "user_id": user["id"]}
+
+
+ROUTES = [
+    (r"/creation-tools/v1/works/(\d+)/comments", "GET", work_comments),
+    (
+        r"/creation-tools/v1/works/(\d+)/comment/(\d+)",
+        "DELETE",
+        lambda data, query, *ids: (204, None),
+    ),
+    (r"/creation-tools/v1/works/(\d+)", "GET", lambda d, q, i: (200, d.work(int(i)))),
+    (r"/api/work/info/(\d+)", "GET", lambda d, q, i: (200, d.work(int(i)))),
+    (r"/creation-tools/v2/user/center/work-list", "GET", work_list),
+    (r"/creation-tools/v1/user/fans", "GET", user_list),
+    (r"/creation-tools/v1/user/followers", "GET", user_list),
+    (r"/creation-tools/v1/user/center/honor", "GET", user_honor),
+    (
+        r"/api/user/info/detail/(\d+)",
+        "GET",
+        lambda d, q, i: (200, {"data": {"userInfo": d.user(int(i))}}),
+    ),
+    (r"/web/message-record/count", "GET", message_count),
+    (r"/web/message-record", "GET", message_record),
+    (r"/web/forums/posts/all", "GET", posts_all),
+    (r"/web/forums/posts/(\d+)/details", "GET", lambda d, q, i: (200, d.post(int(i)))),
+    (r"/web/forums/posts/(\d+)/replies", "GET", post_replies),
+    (r"/web/shops/(\d+)/users", "GET", shop_users),
+    (r"/web/shops/(\d+)", "GET", lambda d, q, i: (200, d.shop(int(i)))),
+    (r"/web/work-shops/search", "GET", shop_search),
+    (
+        r"/coconut/clouddb/currentTime",
+        "GET",
+        lambda d, q: (200, {"data": int(time.time())}),
+    ),
+]
+
+
+def parse_options(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="本地模拟的编程猫接口")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8520)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--works", type=int, default=50, help="每个用户的作品数")
+    parser.add_argument("--comments", type=int, default=1000, help="每个作品的评论数")
+    parser.add_argument("--fans", type=int, default=1000, help="粉丝/关注数")
+    parser.add_argument("--messages", type=int, default=100, help="未读回复数")
+    parser.add_argument("--replies", type=int, default=100, help="每个帖子的回复数")
+    parser.add_argument("--members", type=int, default=100, help="每个工作室的成员数")
+    parser.add_argument("--shops", type=int, default=500, help="工作室总数")
+    parser.add_argument("--ad-rate", type=float, default=0.02, help="广告评论比例")
+    parser.add_argument("--max-limit", type=int, default=200, help="单页最大条数")
+    parser.add_argument(
+        "--gzip-min-size",
+        type=int,
+        default=1024,
+        help="压缩的最小响应字节数, 负数为不压缩",
+    )
+    parser.add_argument(
+        "--max-ids", type=int, default=20, help="批量接口单次最多的id数"
+    )
+    parser.add_argument("--latency", type=float, default=0.05, help="响应延迟(秒)")
+    parser.add_argument("--jitter", type=float, default=0.01, help="延迟抖动(秒)")
+    parser.add_argument(
+        "--capacity", type=int, default=0, help="超过该并发数时延迟按比例增加, 0为不限"
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回500的比例")
+    parser.add_argument("--rate", type=float, default=0, help="每秒请求上限, 0为不限")
+    parser.add_argument(
+        "--http2", action="store_true", help="以HTTP/2(h2c)提供服务, 需要h2库"
+    )
+    parser.add_argument("--verbose", action="store_true")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    options = parse_options()
+    if options.http2 and h2 is None:
+        raise SystemExit("--http2需要安装h2: pip install h2")
+    api = MockAPI(options)
+    protocol = "h2c" if options.http2 else "HTTP/1.1"
+    print(f"模拟接口已启动({protocol}): http://{options.host}:{options.port}")
+    print("将data/data.json中的BASE_URL改为上面的地址即可进行端到端测试")
+    try:
+        if options.http2:
+            asyncio.run(serve_http2(api))
+        else:
+            MockServer(api).serve_forever()
+    except KeyboardInterrupt:
+        pass
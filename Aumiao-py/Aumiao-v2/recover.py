@@ -43,6 +43,101 @@ data = {
         },
         "BASE_URL": "https://api.codemao.cn",
         "SLOGAN": "欢迎使用Aumiao-PY!\n你说的对，但是《Aumiao》是一款由Aumiao开发团队开发的编程猫自动化工具于2023年5月2日发布，工具以编程猫宇宙为舞台，玩家可以扮演扮演毛毡用户在这个答辩💩社区毛线🧶坍缩并邂逅各种不同的乐子人😋。在领悟了《猫站圣经》后，打败强敌扫厕所😡，在维护编程猫核邪铀删的局面的同时，逐步揭开编程猫社区的真相",
+        "CONCURRENCY": 16,
+        "POOL": {
+            "connections": 10,
+            "maxsize": 10,
+            "block": False,
+        },
+        "RATE_LIMIT": {
+            "read": {
+                "rate": 10,
+                "burst": 10,
+            },
+            "message": {
+                "rate": 3,
+                "burst": 3,
+            },
+            "write": {
+                "rate": 2,
+                "burst": 2,
+            },
+            "delete": {
+                "rate": 1,
+                "burst": 2,
+            },
+        },
+        "CACHE": {
+            "size": 512,
+            "ttl": {
+                "/api/user/info/detail/{id}": 600,
+                "/creation-tools/v1/user/center/honor": 600,
+                "/creation-tools/v1/works/{id}": 600,
+                "/api/work/info/{id}": 600,
+                "/web/shops/{id}": 1800,
+            },
+        },
+        "RETRY": {
+            "retries": 3,
+            "base": 0.5,
+            "cap": 30,
+            "deadline": 60,
+            "jitter": True,
+        },
+        "BREAKER": {
+            "threshold": 5,
+            "reset": 30,
+            "probes": 1,
+        },
+        "TIMEOUT": {
+            "connect": 3.05,
+            "read": 15,
+        },
+        "PRIORITY": {
+            "default": "interactive",
+            "reserved": 1,
+        },
+        "COMPRESSION": [
+            "br",
+            "gzip",
+            "deflate",
+        ],
+        "DNS_TTL": 0,
+        "WARM_UP": {
+            "enabled": False,
+            "hosts": [
+                "https://api.codemao.cn",
+                "https://open-service.codemao.cn",
+                "https://shequ.codemao.cn",
+            ],
+            "timeout": 5,
+        },
+        "HTTP2": {
+            "enabled": False,
+            "prior_knowledge": False,
+        },
+        "BATCH": {
+            "window": 0.01,
+            "size": 20,
+        },
+        "AIMD": {
+            "enabled": False,
+            "initial": 4,
+            "min": 1,
+            "max": 32,
+            "increase": 1,
+            "decrease": 0.5,
+        },
+        "FAN_OUT": 4,
+        "PAGE_SIZE": {
+            "enabled": True,
+            "probe": 1000,
+            "limits": {},
+        },
+        "IDENTITY": {
+            "ttl": 600,
+            "size": 4096,
+        },
     },
     "ACCOUNT_DATA": {
         "identity": "identity",
@@ -1,4 +1,4 @@
-from .app import acquire, data, file, tool
+from .app import acquire, data, file, identity, tool
 from .client import community, post, shop, union, user, work
 
 # 定义版本、作者和团队信息
@@ -9,21 +9,32 @@ team_members = "Aurzex, MoonLeaaaf, Nomen, MiTao"
 
 # 实例化app模块中的类
 app_acquire = acquire.CodeMaoClient()
+app_acquire_async = acquire.AsyncCodeMaoClient()
 app_data = data.CodeMaoData()
 app_file = file.CodeMaoFile()
+app_identity = identity.CodeMaoIdentity()
 app_tool_process = tool.CodeMaoProcess()
 app_tool_routine = tool.CodeMaoRoutine()
 
 # 实例化client模块中的类
 client_community_obtain = community.Obtain()
+client_community_obtain_async = community.AsyncObtain()
 client_community_login = community.Login()
 client_post_obtain = post.Obtain()
+client_post_obtain_async = post.AsyncObtain()
 client_shop_obtain = shop.Obtain()
+client_shop_obtain_async = shop.AsyncObtain()
 client_shop_motion = shop.Motion()
 client_union_community = union.CommunityUnion()
 client_union_work = union.WorkUnion()
 client_union_user = union.UserUnion()
 client_user_obtain = user.Obtain()
+client_user_obtain_async = user.AsyncObtain()
 client_user_motion = user.Motion()
 client_work_motion = work.Motion()
 client_work_obtain = work.Obtain()
+client_work_obtain_async = work.AsyncObtain()
+
+# 按配置在后台预热fan_out线程池中的连接, 不阻塞启动; 异步会话在创建时各自预热
+if app_data.PROGRAM_DATA["WARM_UP"]["enabled"]:
+    app_acquire.warm_up(wait=False)
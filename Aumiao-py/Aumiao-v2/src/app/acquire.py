@@ -1,14 +1,71 @@
+import asyncio
+import threading
 import time
-from typing import Any, Dict, List, Optional
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import count, islice
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
+import httpx
 import requests
-from requests.exceptions import ConnectionError, HTTPError, RequestException, Timeout
+from requests.exceptions import ConnectionError, HTTPError, Timeout
 
-from ..decorator import retry
+from ..decorator import RETRY_STATUS, RetryPolicy
+from . import breaker as Breaker
+from . import cache as Cache
+from . import checkpoint as Checkpoint
+from . import codec as Codec
+from . import concurrency as Concurrency
 from . import data as Data
+from . import flight as Flight
+from . import limit as Limit
+from . import metrics as Metrics
+from . import paging as Paging
+from . import session as Session
 from . import tool as Tool
 
-session = requests.session()
+# 每个事件循环各自持有一个异步会话和并发信号量, 与同步会话共用cookie
+async_sessions = weakref.WeakKeyDictionary()
+# 异步会话创建时启动的预热任务, 保留引用直到完成
+warm_up_tasks = set()
+# 所有客户端共用的重试策略, 参数见PROGRAM_DATA["RETRY"]
+retry_policy = RetryPolicy(**Data.CodeMaoData().PROGRAM_DATA["RETRY"])
+# fetch_all_data并发获取分页的线程池, 所有客户端共用, 线程中的会话与长连接得以复用
+fan_out_pool: Optional[ThreadPoolExecutor] = None
+fan_out_lock = threading.Lock()
+
+
+def get_fan_out_pool() -> ThreadPoolExecutor:
+    global fan_out_pool
+    with fan_out_lock:
+        if fan_out_pool is None:
+            fan_out_pool = ThreadPoolExecutor(
+                max_workers=Data.CodeMaoData().PROGRAM_DATA["CONCURRENCY"],
+                thread_name_prefix="fan-out",
+            )
+        return fan_out_pool
+
+
+# 请求在截止时间(deadline)前未能完成时抛出
+class DeadlineExceeded(Timeout):
+    pass
+
+
+# fetch_all_data的返回值, 截止时间到达时partial为True, 内容为已获取的部分
+class FetchResult(list):
+    partial: bool = False
 
 
 class CodeMaoClient:
@@ -17,8 +74,25 @@ class CodeMaoClient:
         self.tool_process = Tool.CodeMaoProcess()
         self.HEADERS = self.data.PROGRAM_DATA["HEADERS"]
         self.BASE_URL = self.data.PROGRAM_DATA["BASE_URL"]
-        global session
+        self.TIMEOUT = self.data.PROGRAM_DATA["TIMEOUT"]
+        self.FAN_OUT = self.data.PROGRAM_DATA["FAN_OUT"]
+        self.session = Session.CodeMaoSession()
+        self.limiter = Limit.CodeMaoLimiter()
+        self.cache = Cache.CodeMaoCache()
+        self.flight = Flight.CodeMaoFlight()
+        self.retry_policy = retry_policy
+        self.breaker = Breaker.CodeMaoBreaker()
+        self.metrics = Metrics.CodeMaoMetrics()
+        self.concurrency = Concurrency.CodeMaoConcurrency()
+        self.page_size = Paging.CodeMaoPageSize()
 
+    # group为限速分组, 不传则按请求方法和url自动判断
+    # idempotent为True时非幂等请求(如post)失败也会重试
+    # timeout为(连接超时, 读取超时), 不传则使用PROGRAM_DATA["TIMEOUT"]
+    # deadline为time.monotonic()下的截止时间点, 超时与重试都不会越过它
+    # priority为优先级(interactive/background), 交互请求总是先于后台请求获得限速额度
+    # stream为True时不预先读取响应体, 此类请求不使用缓存也不与其他请求合并
+    # 未自定义请求头的GET请求, url和参数相同的并发请求只实际发出一次
     def send_request(
         self,
         url: str,
@@ -26,52 +100,1112 @@ class CodeMaoClient:
         params: Optional[Dict] = None,
         data: Any = None,
         headers: Dict = None,
-        sleep: int = 0.3,
+        group: Optional[str] = None,
+        idempotent: Optional[bool] = None,
+        timeout: Optional[Tuple[float, float]] = None,
+        deadline: Optional[float] = None,
+        stream: bool = False,
+        priority: Optional[str] = None,
     ) -> Optional[Any]:
 
-        headers = headers or self.HEADERS
         url = url if "http" in url else f"{self.BASE_URL}{url}"
-        time.sleep(sleep)
-        try:
-            response = session.request(
-                method=method, url=url, headers=headers, params=params, data=data
+        request = partial(
+            self.perform_request,
+            url=url,
+            method=method,
+            params=params,
+            data=data,
+            headers=headers,
+            group=group,
+            idempotent=idempotent,
+            timeout=timeout,
+            deadline=deadline,
+            stream=stream,
+            priority=priority,
+        )
+        if self.mergeable(method, headers, timeout, deadline) and not stream:
+            return self.flight.do(self.flight_key(url, params, priority), request)
+        return request()
+
+    # 只合并不带截止时间和超时的GET请求, 否则其他调用者会收到发起者的DeadlineExceeded
+    def mergeable(
+        self,
+        method: str,
+        headers: Optional[Dict],
+        timeout: Optional[Tuple[float, float]],
+        deadline: Optional[float],
+    ) -> bool:
+        return (
+            method.lower() == "get"
+            and headers is None
+            and timeout is None
+            and deadline is None
+        )
+
+    # 优先级不同的请求分别合并, 交互请求不会排在后台请求之后
+    def flight_key(
+        self, url: str, params: Optional[Dict], priority: Optional[str]
+    ) -> str:
+        priority = priority or self.limiter.PRIORITY["default"]
+        return f"{priority} {self.cache.key(url, params)}"
+
+    # 配置了缓存有效期的GET接口优先使用缓存
+    # 连接失败或返回RETRY_STATUS中的状态码时按重试策略重试
+    def perform_request(
+        self,
+        url: str,
+        method: str,
+        params: Optional[Dict] = None,
+        data: Any = None,
+        headers: Dict = None,
+        group: Optional[str] = None,
+        idempotent: Optional[bool] = None,
+        timeout: Optional[Tuple[float, float]] = None,
+        deadline: Optional[float] = None,
+        stream: bool = False,
+        priority: Optional[str] = None,
+    ) -> Optional[Any]:
+
+        headers = headers or self.HEADERS
+        group = group or self.limiter.classify(method, url)
+        template = self.tool_process.process_template(url)
+        retryable = self.retry_policy.should_retry(method, idempotent)
+        ttl = self.cache.ttl(url) if method.lower() == "get" and not stream else None
+        if ttl:
+            cache_key = self.cache.key(url, params)
+            entry, fresh = self.cache.lookup(cache_key)
+            if fresh:
+                return self.cache.build(entry)
+            if entry:
+                headers = {**headers, **self.cache.conditional(entry)}
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            self.metrics.record_throttle(
+                template, self.limiter.acquire(group, priority)
             )
+            request_timeout = self.get_timeout(timeout, deadline)
+            self.breaker.allow(template)
+            window = self.concurrency.window(url)
+            try:
+                entered = window.enter(
+                    deadline, priority or self.limiter.PRIORITY["default"]
+                )
+            except BaseException:
+                self.breaker.release(template)
+                raise
+            if entered is None:
+                self.breaker.release(template)
+                raise DeadlineExceeded("等待并发窗口时已到达截止时间")
+            sent = time.perf_counter()
+            try:
+                response = self.session.get().request(
+                    method=method,
+                    url=url,
+                    headers=headers,
+                    params=params,
+                    data=data,
+                    timeout=request_timeout,
+                    stream=stream,
+                )
+            except (ConnectionError, Timeout) as err:
+                window.leave(time.perf_counter() - sent, failed=True)
+                self.metrics.record(
+                    template, None, time.perf_counter() - sent, error=type(err).__name__
+                )
+                self.breaker.failure(template)
+                self.check_deadline(deadline, err)
+                wait = (
+                    self.get_backoff(attempt, started, deadline) if retryable else None
+                )
+                if wait is None:
+                    print(f"网络请求异常: {err}")
+                    raise
+            except BaseException:
+                window.leave()
+                self.breaker.release(template)
+                raise
+            else:
+                window.leave(time.perf_counter() - sent, response.status_code)
+                self.record_response(
+                    template, response, time.perf_counter() - sent, stream
+                )
+                self.record_health(template, response.status_code)
+                if response.status_code == 429:
+                    self.limiter.throttle(group, response.headers.get("Retry-After"))
+                retry_after = Limit.parse_retry_after(
+                    response.headers.get("Retry-After")
+                )
+                if response.status_code not in RETRY_STATUS or not retryable:
+                    break
+                wait = self.get_backoff(attempt, started, deadline, retry_after)
+                if wait is None:
+                    break
+                response.close()
+            print(f"请求 {template} 失败, {wait:.2f}秒后重试")
+            self.retry_policy.record(template)
+            self.metrics.record_retry(template)
+            time.sleep(wait)
+            attempt += 1
+        try:
+            if ttl and response.status_code == 304 and entry:
+                self.cache.refresh(cache_key)
+                return self.cache.build(entry)
             response.raise_for_status()
+            if ttl and response.status_code == 200:
+                self.cache.store(cache_key, response, ttl)
             return response
-        except (HTTPError, ConnectionError, Timeout, RequestException) as err:
+        except HTTPError as err:
             print(f"错误码: {response.status_code} 错误信息: {response.text}")
             print(f"网络请求异常: {err}")
             return response
 
-    @retry(retries=3, delay=20)
+    # 按顺序逐页产出(下一页的偏移量或页码, 每页数量, data_key数组), 各分页在共用线程池中并发获取(不超过concurrency个)
+    # 首个响应即为第一页, 其数据直接产出, 不再重复请求
+    # total_key为None时不读取总数(适用于总数不可靠的接口), 逐页获取直到某一页的条数少于每页数量
+    # start为继续抓取的偏移量或页码(从断点恢复时), 此时同样不读取总数, 从start开始翻到不满一页为止
+    # 每页数量提升为该接口已知的上限(PAGE_SIZE), 上限未知时以PAGE_SIZE["probe"]试探并记录
+    # page_bytes为每页的目标传输字节数, 按实测的每条数据字节数缩小每页数量(不超过params中的数量)
+    # 调用方停止迭代后尚未开始的分页会被取消
+    def iter_pages(
+        self,
+        url: str,
+        params: Dict[str, any],
+        total_key: Optional[str],
+        data_key: str,
+        method: str,
+        args: Dict,
+        deadline: Optional[float],
+        priority: str,
+        page_bytes: Optional[int],
+        concurrency: int,
+        start: Optional[int] = None,
+    ) -> Iterator[Tuple[int, int, List[Dict]]]:
+        template = self.tool_process.process_template(url)
+        requested = params
+        if start is None:
+            # 按已知的每页上限翻页; 不读取总数时只有按偏移量翻页才能试探上限
+            probe = total_key is not None or (method == "offset" and not page_bytes)
+            limit = self.page_size.limit(template, params[args["amount"]], probe)
+            params = {**params, args["amount"]: limit}
+        # 每页数量确实被提升时才会试探上限, 被拒绝时才需要退回原来的数量
+        raised = params[args["amount"]] > requested[args["amount"]]
+        probing = raised and self.page_size.probing(template)
+
+        def read_items(response: Any) -> List[Dict]:
+            self.check_page(url, response)
+            items = self.tool_process.process_path(
+                Codec.decode(response.content), data_key
+            )
+            self.metrics.record_items(template, len(items))
+            return items
+
+        def fetch_page(value: int, items_per_page: int) -> Tuple[int, int, List[Dict]]:
+            response = self.send_request(
+                url=url,
+                method="get",
+                params={
+                    **params,
+                    args["amount"]: items_per_page,
+                    args["remove"]: value,
+                },
+                deadline=deadline,
+                priority=priority,
+            )
+            step = items_per_page if method == "offset" else 1
+            return value + step, items_per_page, read_items(response)
+
+        if total_key is None or start is not None:
+            items_per_page = self.page_limit(
+                template, params[args["amount"]], page_bytes
+            )
+            self.metrics.record_saved(template)
+            if items_per_page > requested[args["amount"]]:
+                # 提升后的每页数量被拒绝时改用原来的每页数量翻页
+                # 试探上限时不知道总数就无法区分最后一页与被截断的一页, 第一页不满时再取紧接着的一页确认
+                value = next(self.page_values(method, items_per_page))
+                response, fell_back = self.fetch_first_page(
+                    template,
+                    url,
+                    {**params, args["amount"]: items_per_page, args["remove"]: value},
+                    {**requested, args["remove"]: value},
+                    args["amount"],
+                    deadline,
+                    priority,
+                )
+                first = read_items(response)
+                if fell_back:
+                    params = requested
+                    items_per_page = params[args["amount"]]
+                if probing and method == "offset" and not fell_back:
+                    following = None
+                    if 0 < len(first) < items_per_page:
+                        following = fetch_page(len(first), items_per_page)[2]
+                    discovered = self.confirm_page_limit(
+                        template, items_per_page, first, following
+                    )
+                else:
+                    step = items_per_page if method == "offset" else 1
+                    discovered = [(value + step, items_per_page, first)]
+                for page in discovered:
+                    yield page
+                    if len(page[2]) < page[1]:
+                        return
+                start, items_per_page = discovered[-1][:2]
+            pages = self.fan_out(
+                partial(fetch_page, items_per_page=items_per_page),
+                self.page_values(method, items_per_page, start),
+                concurrency,
+            )
+            try:
+                for page in pages:
+                    yield page
+                    if len(page[2]) < items_per_page:
+                        return
+            finally:
+                pages.close()
+        initial_response, fell_back = self.fetch_first_page(
+            template, url, params, requested, args["amount"], deadline, priority
+        )
+        if fell_back:
+            params = requested
+        self.check_page(url, initial_response)
+        initial_data = Codec.decode(initial_response.content)
+        total_items = int(self.tool_process.process_path(initial_data, total_key))
+        first_items = self.tool_process.process_path(initial_data, data_key)
+        self.metrics.record_items(template, len(first_items))
+        if not fell_back:
+            self.page_size.observe(
+                template, params[args["amount"]], len(first_items), total_items
+            )
+        reuse, items_per_page, values = self.plan_pages(
+            template, params, first_items, total_items, method, args, page_bytes
+        )
+        if reuse:
+            self.metrics.record_saved(template)
+            next_value = len(first_items) if method == "offset" else 2
+            yield next_value, items_per_page, first_items
+        yield from self.fan_out(
+            partial(fetch_page, items_per_page=items_per_page), values, concurrency
+        )
+
+    # 翻页请求失败时抛出HTTPError, 出错的一页不能当作空页或最后一页, 否则结果不完整却无从得知
+    def check_page(self, url: str, response: Any) -> None:
+        if response.status_code != 200:
+            raise HTTPError(
+                f"获取 {url} 的分页失败, 错误码: {response.status_code}",
+                response=response,
+            )
+
+    # 发出翻页的第一个请求, 服务器不接受提升后的每页数量(非200)时按fallback中原来的每页数量重发
+    # 重发成功时记下被拒绝的数量, 之后该接口不再以此数量请求; 返回(响应, 是否改用了fallback)
+    def fetch_first_page(
+        self,
+        template: str,
+        url: str,
+        params: Dict[str, any],
+        fallback: Dict[str, any],
+        amount: str,
+        deadline: Optional[float],
+        priority: str,
+    ) -> Tuple[Any, bool]:
+        response = self.send_request(
+            url=url, method="get", params=params, deadline=deadline, priority=priority
+        )
+        if response.status_code == 200 or params[amount] == fallback[amount]:
+            return response, False
+        response = self.send_request(
+            url=url, method="get", params=fallback, deadline=deadline, priority=priority
+        )
+        if response.status_code == 200:
+            self.page_size.reject(template, params[amount], fallback[amount])
+        return response, True
+
+    # 试探每页上限时, 由第一页和紧接着的一页(第一页不满时才获取)确定上限
+    # 后一页仍有数据说明第一页被服务器截断, 其条数即为上限; 第一页已满时上限不小于每页数量
+    # 返回已获取的各页(下一页的偏移量, 之后使用的每页数量, 数据), 其中不满一页的即为最后一页
+    def confirm_page_limit(
+        self,
+        template: str,
+        items_per_page: int,
+        first: List[Dict],
+        following: Optional[List[Dict]],
+    ) -> List[Tuple[int, int, List[Dict]]]:
+        if len(first) == items_per_page:
+            self.page_size.record(template, items_per_page)
+            return [(items_per_page, items_per_page, first)]
+        if not following:
+            return [(len(first), items_per_page, first)]
+        self.page_size.record(template, len(first))
+        return [
+            (len(first), len(first), first),
+            (len(first) + len(following), len(first), following),
+        ]
+
+    # 获取全部分页, 各分页并发获取(不超过concurrency个, 默认FAN_OUT), 按顺序合并
+    # total_key为None或从断点继续时默认在当前线程中逐页获取, 避免在最后一页之后多发请求
+    # deadline会传递给每个分页请求, 到达截止时间时返回已获取的部分并标记partial
+    # 翻页抓取默认以后台优先级发出, 不挤占交互请求的限速额度
+    # checkpoint为True时每获取完一页保存断点, 中断或出错后再次调用时从断点继续, 全部获取后删除断点
     def fetch_all_data(
         self,
         url: str,
         params: Dict[str, any],
-        total_key: str = "total",
+        total_key: Optional[str] = "total",
+        data_key: str = "item",
+        method: str = "offset",
+        args: Dict = {"amount": "limit", "remove": "offset"},
+        deadline: Optional[float] = None,
+        priority: str = "background",
+        page_bytes: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        checkpoint: bool = False,
+    ) -> FetchResult:
+        all_data = FetchResult()
+        saved, start = None, None
+        if checkpoint:
+            saved = Checkpoint.CodeMaoCheckpoint(url, params)
+            params, page_bytes, start = self.resume(saved, url, params, args, all_data)
+        if concurrency is None:
+            # 不知道总数(包括从断点继续)时逐页获取, 并发获取会在最后一页之后多发请求
+            count_free = total_key is None or start is not None
+            concurrency = 0 if count_free else self.FAN_OUT
+        try:
+            for next_value, items_per_page, items in self.iter_pages(
+                url,
+                params,
+                total_key,
+                data_key,
+                method,
+                args,
+                deadline,
+                priority,
+                page_bytes,
+                concurrency,
+                start,
+            ):
+                all_data.extend(items)
+                if saved is not None:
+                    saved.append(next_value, items_per_page, items)
+        except DeadlineExceeded as err:
+            print(f"获取 {url} 时{err}, 返回已获取的{len(all_data)}条数据")
+            all_data.partial = True
+            return all_data
+        if saved is not None:
+            saved.clear()
+        return all_data
+
+    # 载入断点中已获取的数据, 返回继续抓取所用的(params, page_bytes, 起始偏移量或页码)
+    # 按断点中的每页数量继续翻页(按页码翻页时每页数量不能改变), 没有断点时原样返回
+    def resume(
+        self,
+        saved: Checkpoint.CodeMaoCheckpoint,
+        url: str,
+        params: Dict[str, any],
+        args: Dict,
+        all_data: FetchResult,
+    ) -> Tuple[Dict[str, any], Optional[int], Optional[int]]:
+        start, limit, items = saved.load()
+        if start is None:
+            return params, None, None
+        print(f"从断点继续获取 {url}, 已获取{len(items)}条数据")
+        all_data.extend(items)
+        return {**params, args["amount"]: limit}, None, start
+
+    # fetch_all_data的惰性版本: 逐个产出data_key数组中的元素, 不保存已产出的数据
+    # 调用方处理当前页时, 后面的prefetch页已在后台获取; prefetch为0时用到下一页才请求
+    # 调用方提前停止迭代(break)后不再发出新的请求, 到达截止时间时抛出DeadlineExceeded
+    def iter_all_data(
+        self,
+        url: str,
+        params: Dict[str, any],
+        total_key: Optional[str] = "total",
         data_key: str = "item",
         method: str = "offset",
         args: Dict = {"amount": "limit", "remove": "offset"},
-    ) -> List[Dict]:
-        initial_response = self.send_request(url=url, method="get", params=params)
-        total_items = int(
-            self.tool_process.process_path(initial_response.json(), total_key)
+        deadline: Optional[float] = None,
+        priority: str = "background",
+        page_bytes: Optional[int] = None,
+        prefetch: int = 1,
+    ) -> Iterator[Dict]:
+        pages = self.iter_pages(
+            url,
+            params,
+            total_key,
+            data_key,
+            method,
+            args,
+            deadline,
+            priority,
+            page_bytes,
+            prefetch,
         )
+        try:
+            for _, _, items in pages:
+                yield from items
+        finally:
+            pages.close()
+
+    # fetch_all_data的流式版本: 边接收边解析, 逐个产出data_key数组中的元素
+    # 不预先读取总数, 某一页的条数少于每页数量时视为最后一页
+    # 某一页请求失败时抛出HTTPError, 此前的元素已经产出
+    def stream_all_data(
+        self,
+        url: str,
+        params: Dict[str, any],
+        data_key: str = "item",
+        method: str = "offset",
+        args: Dict = {"amount": "limit", "remove": "offset"},
+        deadline: Optional[float] = None,
+        chunk_size: int = 65536,
+        priority: str = "background",
+    ) -> Iterator[Dict]:
+        params = dict(params)
         items_per_page = params[args["amount"]]
-        total_pages = (total_items // items_per_page) + (
-            1 if total_items % items_per_page > 0 else 0
-        )
-        all_data = []
-        for page in range(total_pages):
+        page = 0
+        while True:
             if method == "offset":
                 params[args["remove"]] = page * items_per_page
             elif method == "page":
-                params[args["remove"]] = page + 1 if page != total_pages else page
-            response = self.send_request(url=url, method="get", params=params)
-            all_data.extend(self.tool_process.process_path(response.json(), data_key))
-        return all_data
+                params[args["remove"]] = page + 1
+            response = self.send_request(
+                url=url,
+                method="get",
+                params=params,
+                deadline=deadline,
+                stream=True,
+                priority=priority,
+            )
+            count = 0
+            with response:
+                if response.status_code != 200:
+                    # 不能把出错的一页当作最后一页, 否则调用方拿到的数据不完整却无从得知
+                    raise HTTPError(
+                        f"获取 {url} 第{page + 1}页失败, 错误码: {response.status_code}",
+                        response=response,
+                    )
+                for item in Codec.iter_items(
+                    response.iter_content(chunk_size=chunk_size), data_key
+                ):
+                    count += 1
+                    yield item
+            if count < items_per_page:
+                return
+            page += 1
+
+    # 在共用线程池中并发执行func(page), 同时进行的不超过concurrency个, 按pages的顺序产出结果
+    # 产出一个结果前已提交下一页, 调用方处理结果时后面的分页仍在获取; concurrency为0时在当前线程中依次执行
+    # 某一页出错或调用方停止迭代时取消尚未开始的分页, 之前的结果已经产出
+    def fan_out(
+        self, func: Callable[[int], Any], pages: Iterable[int], concurrency: int
+    ) -> Iterator[Any]:
+        pages = iter(pages)
+        if concurrency < 1:
+            for page in pages:
+                yield func(page)
+            return
+        pool = get_fan_out_pool()
+        futures = deque(pool.submit(func, page) for page in islice(pages, concurrency))
+        try:
+            while futures:
+                result = futures.popleft().result()
+                for page in islice(pages, 1):
+                    futures.append(pool.submit(func, page))
+                yield result
+        finally:
+            for future in futures:
+                future.cancel()
+
+    # 根据首个响应规划其余分页, 返回(首个响应能否作为第一页, 每页数量, 其余分页的参数值)
+    # 首个响应的条数少于请求数量而总数更多时, 说明服务器限制了每页数量, 按实际条数翻页
+    def plan_pages(
+        self,
+        template: str,
+        params: Dict[str, any],
+        first_items: List,
+        total_items: int,
+        method: str,
+        args: Dict,
+        page_bytes: Optional[int],
+    ) -> Tuple[bool, int, List[int]]:
+        requested = params[args["amount"]]
+        if 0 < len(first_items) < min(requested, total_items):
+            requested = len(first_items)
+        items_per_page = self.page_limit(template, requested, page_bytes)
+        first = 0 if method == "offset" else 1
+        reuse = params.get(args["remove"], first) == first and (
+            method == "offset" or items_per_page == requested
+        )
+        if method == "offset":
+            start = len(first_items) if reuse else 0
+            return (
+                reuse,
+                items_per_page,
+                list(range(start, total_items, items_per_page)),
+            )
+        total_pages = (total_items // items_per_page) + (
+            1 if total_items % items_per_page > 0 else 0
+        )
+        return reuse, items_per_page, list(range(2 if reuse else 1, total_pages + 1))
+
+    # 不读取总数时依次产出各分页的参数值(offset为偏移量, page为页码), start为起始值
+    @staticmethod
+    def page_values(
+        method: str, items_per_page: int, start: Optional[int] = None
+    ) -> Iterator[int]:
+        if method == "offset":
+            return count(start or 0, items_per_page)
+        return count(start or 1)
+
+    # 由该接口实测的每条数据传输字节数, 计算每页约为page_bytes字节时的每页数量
+    def page_limit(self, template: str, limit: int, page_bytes: Optional[int]) -> int:
+        per_item = self.metrics.bytes_per_item(template) if page_bytes else None
+        if not per_item:
+            return limit
+        return max(1, min(limit, int(page_bytes // per_item)))
+
+    # 预热之后实际发出请求的会话, 每个线程只使用自己的会话
+    # fan_out线程池的每个线程各自连接hosts(默认为WARM_UP["hosts"]), wait为True时调用线程同样预热, 返回其耗时
+    # wait为False时只在线程池中后台预热, 不与调用线程的首个请求争用会话, 不阻塞启动
+    # 异步会话按事件循环创建, 见AsyncCodeMaoClient.warm_up
+    def warm_up(
+        self, hosts: Optional[Iterable[str]] = None, wait: bool = True
+    ) -> Optional[Dict[str, Dict]]:
+        hosts = list(hosts or self.session.WARM_UP["hosts"])
+        workers = self.data.PROGRAM_DATA["CONCURRENCY"]
+        barrier = threading.Barrier(workers)
+
+        # 每个任务先在屏障处等齐, 保证分布在线程池的不同线程上
+        def warm() -> Dict[str, Dict]:
+            try:
+                barrier.wait(self.session.WARM_UP["timeout"])
+            except threading.BrokenBarrierError:
+                pass
+            return self.session.warm_up(hosts)
+
+        pool = get_fan_out_pool()
+        futures = [pool.submit(warm) for _ in range(workers)]
+        if not wait:
+            return None
+        timings = self.session.warm_up(hosts)
+        for future in futures:
+            future.result()
+        return timings
 
     def update_cookie(self, cookie: str):
         _cookie = requests.utils.dict_from_cookiejar(cookie)
-        session.cookies.update(_cookie)
+        self.session.update_cookie(_cookie)
         return True
+
+    # 计算本次请求的(连接超时, 读取超时), 不会超过距截止时间的剩余秒数
+    def get_timeout(
+        self, timeout: Optional[Tuple[float, float]], deadline: Optional[float]
+    ) -> Tuple[float, float]:
+        connect, read = timeout or (self.TIMEOUT["connect"], self.TIMEOUT["read"])
+        if deadline is None:
+            return connect, read
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("已到达截止时间")
+        return min(connect, remaining), min(read, remaining)
+
+    # 按重试策略计算等待秒数, 等待后会越过截止时间时返回None
+    def get_backoff(
+        self,
+        attempt: int,
+        started: float,
+        deadline: Optional[float],
+        retry_after: Optional[float] = None,
+    ) -> Optional[float]:
+        wait = self.retry_policy.backoff(attempt, started, retry_after)
+        if wait is None or deadline is None:
+            return wait
+        return wait if time.monotonic() + wait < deadline else None
+
+    # 请求出错时若已到达截止时间, 改为抛出DeadlineExceeded
+    def check_deadline(self, deadline: Optional[float], err: Exception) -> None:
+        if deadline is not None and time.monotonic() >= deadline:
+            raise DeadlineExceeded("已到达截止时间") from err
+
+    # 记录一次请求的状态码、耗时与收发字节数, 流式响应按Content-Length计算
+    def record_response(
+        self, template: str, response: Any, latency: float, stream: bool = False
+    ) -> None:
+        if stream:
+            bytes_in = bytes_wire = int(response.headers.get("Content-Length", 0))
+        else:
+            bytes_in = len(response.content)
+            # urllib3响应的tell()为实际从连接读取的(压缩后)字节数
+            tell = getattr(response.raw, "tell", None)
+            bytes_wire = (tell() if callable(tell) else 0) or bytes_in
+        bytes_out = len(response.request.body or b"")
+        self.metrics.record(
+            template, response.status_code, latency, bytes_in, bytes_out, bytes_wire
+        )
+
+    # 5xx视为接口故障, 其余状态码说明接口仍可用
+    def record_health(self, template: str, status_code: int) -> None:
+        if status_code >= 500:
+            self.breaker.failure(template)
+        else:
+            self.breaker.success(template)
+
+    # 接口是否可用(未熔断), url可以是完整地址或接口路径
+    def available(self, url: str) -> bool:
+        return self.breaker.available(self.tool_process.process_template(url))
+
+
+# CodeMaoClient的异步版本, 同一事件循环内最多同时发出CONCURRENCY个请求
+# 限速、缓存、重试、熔断等组件与同步客户端共用
+class AsyncCodeMaoClient(CodeMaoClient):
+    def __init__(self) -> None:
+        super().__init__()
+        self.CONCURRENCY = self.data.PROGRAM_DATA["CONCURRENCY"]
+
+    # 获取当前事件循环的会话与信号量, 不存在则创建
+    def get_session(self) -> tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        if loop not in async_sessions:
+            http2 = self.session.HTTP2
+            client = httpx.AsyncClient(
+                cookies=self.session.cookies,
+                http1=not (http2["enabled"] and http2["prior_knowledge"]),
+                http2=http2["enabled"],
+                limits=httpx.Limits(max_connections=self.CONCURRENCY),
+                headers={
+                    "Accept-Encoding": Codec.accept_encoding(
+                        self.data.PROGRAM_DATA["COMPRESSION"]
+                    )
+                },
+                timeout=None,
+            )
+            async_sessions[loop] = (client, asyncio.Semaphore(self.CONCURRENCY))
+            if self.session.WARM_UP["enabled"]:
+                # 新建的会话在后台预热, 不阻塞首个请求
+                task = loop.create_task(self.warm_up())
+                warm_up_tasks.add(task)
+                task.add_done_callback(warm_up_tasks.discard)
+        return async_sessions[loop]
+
+    # 并发连接hosts(默认为WARM_UP["hosts"]), 连接留在当前事件循环的会话中, 返回每个主机的耗时
+    async def warm_up(self, hosts: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        client, _ = self.get_session()
+
+        async def connect(host: str) -> tuple[str, Dict]:
+            timing = {}
+            started = time.perf_counter()
+            try:
+                response = await client.head(
+                    host, timeout=self.session.WARM_UP["timeout"]
+                )
+                timing["status"] = response.status_code
+            except httpx.HTTPError as err:
+                timing["error"] = type(err).__name__
+            timing["total"] = time.perf_counter() - started
+            return host, timing
+
+        hosts = hosts or self.session.WARM_UP["hosts"]
+        return dict(await asyncio.gather(*map(connect, hosts)))
+
+    async def send_request(
+        self,
+        url: str,
+        method: str,
+        params: Optional[Dict] = None,
+        data: Any = None,
+        headers: Dict = None,
+        group: Optional[str] = None,
+        idempotent: Optional[bool] = None,
+        timeout: Optional[Tuple[float, float]] = None,
+        deadline: Optional[float] = None,
+        priority: Optional[str] = None,
+    ) -> Optional[httpx.Response]:
+
+        url = url if "http" in url else f"{self.BASE_URL}{url}"
+        # 与requests保持一致, 值为None的参数不发送
+        if params:
+            params = {key: value for key, value in params.items() if value is not None}
+        request = partial(
+            self.perform_request,
+            url=url,
+            method=method,
+            params=params,
+            data=data,
+            headers=headers,
+            group=group,
+            idempotent=idempotent,
+            timeout=timeout,
+            deadline=deadline,
+            priority=priority,
+        )
+        if self.mergeable(method, headers, timeout, deadline):
+            return await self.flight.do_async(
+                self.flight_key(url, params, priority), request
+            )
+        return await request()
+
+    async def perform_request(
+        self,
+        url: str,
+        method: str,
+        params: Optional[Dict] = None,
+        data: Any = None,
+        headers: Dict = None,
+        group: Optional[str] = None,
+        idempotent: Optional[bool] = None,
+        timeout: Optional[Tuple[float, float]] = None,
+        deadline: Optional[float] = None,
+        priority: Optional[str] = None,
+    ) -> Optional[httpx.Response]:
+
+        headers = headers or self.HEADERS
+        group = group or self.limiter.classify(method, url)
+        template = self.tool_process.process_template(url)
+        retryable = self.retry_policy.should_retry(method, idempotent)
+        ttl = self.cache.ttl(url) if method.lower() == "get" else None
+        if ttl:
+            cache_key = self.cache.key(url, params)
+            entry, fresh = self.cache.lookup(cache_key)
+            if fresh:
+                return self.cache.build_async(entry)
+            if entry:
+                headers = {**headers, **self.cache.conditional(entry)}
+        client, semaphore = self.get_session()
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            self.metrics.record_throttle(
+                template, await self.limiter.acquire_async(group, priority)
+            )
+            connect, read = self.get_timeout(timeout, deadline)
+            self.breaker.allow(template)
+            window = self.concurrency.window(url)
+            try:
+                entered = await window.enter_async(
+                    deadline, priority or self.limiter.PRIORITY["default"]
+                )
+            except BaseException:
+                self.breaker.release(template)
+                raise
+            if entered is None:
+                self.breaker.release(template)
+                raise DeadlineExceeded("等待并发窗口时已到达截止时间")
+            try:
+                async with semaphore:
+                    # 与同步请求一致, 耗时不含等待信号量的时间
+                    sent = time.perf_counter()
+                    response = await client.request(
+                        method=method,
+                        url=url,
+                        headers=headers,
+                        params=params,
+                        content=data,
+                        timeout=httpx.Timeout(read, connect=connect),
+                    )
+            except httpx.TransportError as err:
+                window.leave(time.perf_counter() - sent, failed=True)
+                self.metrics.record(
+                    template, None, time.perf_counter() - sent, error=type(err).__name__
+                )
+                self.breaker.failure(template)
+                self.check_deadline(deadline, err)
+                wait = (
+                    self.get_backoff(attempt, started, deadline) if retryable else None
+                )
+                if wait is None:
+                    print(f"网络请求异常: {err}")
+                    raise
+            except BaseException:
+                window.leave()
+                self.breaker.release(template)
+                raise
+            else:
+                window.leave(time.perf_counter() - sent, response.status_code)
+                self.record_response(template, response, time.perf_counter() - sent)
+                self.record_health(template, response.status_code)
+                if response.status_code == 429:
+                    self.limiter.throttle(group, response.headers.get("Retry-After"))
+                retry_after = Limit.parse_retry_after(
+                    response.headers.get("Retry-After")
+                )
+                if response.status_code not in RETRY_STATUS or not retryable:
+                    break
+                wait = self.get_backoff(attempt, started, deadline, retry_after)
+                if wait is None:
+                    break
+                await response.aclose()
+            print(f"请求 {template} 失败, {wait:.2f}秒后重试")
+            self.retry_policy.record(template)
+            self.metrics.record_retry(template)
+            await asyncio.sleep(wait)
+            attempt += 1
+        if ttl and response.status_code == 304 and entry:
+            self.cache.refresh(cache_key)
+            return self.cache.build_async(entry)
+        if response.is_error:
+            print(f"错误码: {response.status_code} 错误信息: {response.text}")
+        elif ttl and response.status_code == 200:
+            self.cache.store(cache_key, response, ttl)
+        return response
+
+    # 先获取总数, 再并发请求其余分页(不超过concurrency个, 默认CONCURRENCY), 结果按分页顺序合并
+    # 首个响应直接作为第一页; total_key为None或从断点继续时不读取总数, 默认逐页获取直到某一页的条数少于每页数量
+    # 到达截止时间时返回截止前连续获取到的分页并标记partial
+    # checkpoint为True时每获取完一页保存断点, 中断或出错后再次调用时从断点继续
+    async def fetch_all_data(
+        self,
+        url: str,
+        params: Dict[str, any],
+        total_key: Optional[str] = "total",
+        data_key: str = "item",
+        method: str = "offset",
+        args: Dict = {"amount": "limit", "remove": "offset"},
+        deadline: Optional[float] = None,
+        priority: str = "background",
+        page_bytes: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        checkpoint: bool = False,
+    ) -> FetchResult:
+        all_data = FetchResult()
+        saved, start = None, None
+        if checkpoint:
+            saved = Checkpoint.CodeMaoCheckpoint(url, params)
+            params, page_bytes, start = self.resume(saved, url, params, args, all_data)
+        if concurrency is None:
+            # 不知道总数(包括从断点继续)时逐页获取, 并发获取会在最后一页之后多发请求
+            count_free = total_key is None or start is not None
+            concurrency = 0 if count_free else self.CONCURRENCY
+        try:
+            async for next_value, items_per_page, items in self.iter_pages(
+                url,
+                params,
+                total_key,
+                data_key,
+                method,
+                args,
+                deadline,
+                priority,
+                page_bytes,
+                concurrency,
+                start,
+            ):
+                all_data.extend(items)
+                if saved is not None:
+                    saved.append(next_value, items_per_page, items)
+        except DeadlineExceeded as err:
+            print(f"获取 {url} 时{err}, 返回已获取的{len(all_data)}条数据")
+            all_data.partial = True
+            return all_data
+        if saved is not None:
+            saved.clear()
+        return all_data
+
+    # 按顺序逐页产出(下一页的偏移量或页码, 每页数量, data_key数组)
+    # 同时进行的请求不超过concurrency个(为0时用到下一页才请求)
+    # 首个响应直接作为第一页; total_key为None或给出start时不读取总数, 翻到不满一页为止
+    # 每页数量的试探与上限记录同同步版本
+    # 调用方停止迭代后尚未完成的请求会被取消
+    async def iter_pages(
+        self,
+        url: str,
+        params: Dict[str, any],
+        total_key: Optional[str],
+        data_key: str,
+        method: str,
+        args: Dict,
+        deadline: Optional[float],
+        priority: str,
+        page_bytes: Optional[int],
+        concurrency: int,
+        start: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[int, int, List[Dict]]]:
+        template = self.tool_process.process_template(url)
+        requested = params
+        if start is None:
+            probe = total_key is not None or (method == "offset" and not page_bytes)
+            limit = self.page_size.limit(template, params[args["amount"]], probe)
+            params = {**params, args["amount"]: limit}
+        # 每页数量确实被提升时才会试探上限, 被拒绝时才需要退回原来的数量
+        raised = params[args["amount"]] > requested[args["amount"]]
+        probing = raised and self.page_size.probing(template)
+
+        def read_items(response: httpx.Response) -> List[Dict]:
+            self.check_page(url, response)
+            items = self.tool_process.process_path(
+                Codec.decode(response.content), data_key
+            )
+            self.metrics.record_items(template, len(items))
+            return items
+
+        async def fetch_page(value: int) -> Tuple[int, int, List[Dict]]:
+            response = await self.send_request(
+                url=url,
+                method="get",
+                params={
+                    **params,
+                    args["amount"]: items_per_page,
+                    args["remove"]: value,
+                },
+                deadline=deadline,
+                priority=priority,
+            )
+            step = items_per_page if method == "offset" else 1
+            return value + step, items_per_page, read_items(response)
+
+        count_free = total_key is None or start is not None
+        if count_free:
+            items_per_page = self.page_limit(
+                template, params[args["amount"]], page_bytes
+            )
+            self.metrics.record_saved(template)
+            if items_per_page > requested[args["amount"]]:
+                # 提升后的每页数量被拒绝时改用原来的每页数量翻页
+                # 试探上限时不知道总数就无法区分最后一页与被截断的一页, 第一页不满时再取紧接着的一页确认
+                value = next(self.page_values(method, items_per_page))
+                response, fell_back = await self.fetch_first_page(
+                    template,
+                    url,
+                    {**params, args["amount"]: items_per_page, args["remove"]: value},
+                    {**requested, args["remove"]: value},
+                    args["amount"],
+                    deadline,
+                    priority,
+                )
+                first = read_items(response)
+                if fell_back:
+                    params = requested
+                    items_per_page = params[args["amount"]]
+                if probing and method == "offset" and not fell_back:
+                    following = None
+                    if 0 < len(first) < items_per_page:
+                        following = (await fetch_page(len(first)))[2]
+                    discovered = self.confirm_page_limit(
+                        template, items_per_page, first, following
+                    )
+                else:
+                    step = items_per_page if method == "offset" else 1
+                    discovered = [(value + step, items_per_page, first)]
+                for page in discovered:
+                    yield page
+                    if len(page[2]) < page[1]:
+                        return
+                start, items_per_page = discovered[-1][:2]
+            values = self.page_values(method, items_per_page, start)
+        else:
+            initial_response, fell_back = await self.fetch_first_page(
+                template, url, params, requested, args["amount"], deadline, priority
+            )
+            if fell_back:
+                params = requested
+            self.check_page(url, initial_response)
+            initial_data = Codec.decode(initial_response.content)
+            total_items = int(self.tool_process.process_path(initial_data, total_key))
+            first_items = self.tool_process.process_path(initial_data, data_key)
+            self.metrics.record_items(template, len(first_items))
+            if not fell_back:
+                self.page_size.observe(
+                    template, params[args["amount"]], len(first_items), total_items
+                )
+            reuse, items_per_page, values = self.plan_pages(
+                template, params, first_items, total_items, method, args, page_bytes
+            )
+            values = iter(values)
+            if reuse:
+                self.metrics.record_saved(template)
+                next_value = len(first_items) if method == "offset" else 2
+                yield next_value, items_per_page, first_items
+        pending = deque()
+        try:
+            while True:
+                for value in islice(values, max(concurrency, 1) - len(pending)):
+                    pending.append(asyncio.ensure_future(fetch_page(value)))
+                if not pending:
+                    return
+                page = await pending.popleft()
+                for value in islice(values, concurrency - len(pending)):
+                    pending.append(asyncio.ensure_future(fetch_page(value)))
+                yield page
+                if count_free and len(page[2]) < items_per_page:
+                    return
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def fetch_first_page(
+        self,
+        template: str,
+        url: str,
+        params: Dict[str, any],
+        fallback: Dict[str, any],
+        amount: str,
+        deadline: Optional[float],
+        priority: str,
+    ) -> Tuple[httpx.Response, bool]:
+        response = await self.send_request(
+            url=url, method="get", params=params, deadline=deadline, priority=priority
+        )
+        if response.status_code == 200 or params[amount] == fallback[amount]:
+            return response, False
+        response = await self.send_request(
+            url=url, method="get", params=fallback, deadline=deadline, priority=priority
+        )
+        if response.status_code == 200:
+            self.page_size.reject(template, params[amount], fallback[amount])
+        return response, True
+
+    # fetch_all_data的惰性版本, 调用方处理当前页时后面的prefetch页已在获取
+    # 调用方提前停止迭代后不再发出新的请求, 到达截止时间时抛出DeadlineExceeded
+    async def iter_all_data(
+        self,
+        url: str,
+        params: Dict[str, any],
+        total_key: Optional[str] = "total",
+        data_key: str = "item",
+        method: str = "offset",
+        args: Dict = {"amount": "limit", "remove": "offset"},
+        deadline: Optional[float] = None,
+        priority: str = "background",
+        page_bytes: Optional[int] = None,
+        prefetch: int = 1,
+    ) -> AsyncIterator[Dict]:
+        pages = self.iter_pages(
+            url,
+            params,
+            total_key,
+            data_key,
+            method,
+            args,
+            deadline,
+            priority,
+            page_bytes,
+            prefetch,
+        )
+        try:
+            async for _, _, items in pages:
+                for item in items:
+                    yield item
+        finally:
+            await pages.aclose()
+
+    def record_response(
+        self,
+        template: str,
+        response: httpx.Response,
+        latency: float,
+        stream: bool = False,
+    ) -> None:
+        self.metrics.record(
+            template,
+            response.status_code,
+            latency,
+            len(response.content),
+            len(response.request.content),
+            response.num_bytes_downloaded,
+        )
+
+    # 关闭当前事件循环的会话
+    async def close(self) -> None:
+        loop = asyncio.get_running_loop()
+        if loop in async_sessions:
+            client, _ = async_sessions.pop(loop)
+            await client.aclose()
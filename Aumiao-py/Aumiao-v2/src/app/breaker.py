@@ -0,0 +1,106 @@
+import threading
+import time
+from typing import Dict
+
+from requests.exceptions import RequestException
+
+from ..decorator import Singleton
+from . import data as Data
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+# 熔断中的接口直接拒绝请求时抛出
+class CircuitOpenError(RequestException):
+    pass
+
+
+class Circuit:
+    def __init__(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = 0
+
+
+# 按接口模板熔断: 连续失败threshold次后打开, 打开期间直接拒绝请求
+# 经过reset秒后进入半开状态, 放行最多probes个试探请求, 成功则关闭, 失败则重新打开
+@Singleton
+class CodeMaoBreaker:
+    def __init__(self) -> None:
+        self.data = Data.CodeMaoData()
+        self.BREAKER = self.data.PROGRAM_DATA["BREAKER"]
+        self.circuits: Dict[str, Circuit] = {}
+        self.lock = threading.Lock()
+
+    def circuit(self, template: str) -> Circuit:
+        if template not in self.circuits:
+            self.circuits[template] = Circuit()
+        return self.circuits[template]
+
+    def update(self, circuit: Circuit) -> None:
+        if (
+            circuit.state == OPEN
+            and time.monotonic() - circuit.opened_at >= self.BREAKER["reset"]
+        ):
+            circuit.state = HALF_OPEN
+            circuit.probing = 0
+
+    # 请求前调用, 不允许请求时抛出CircuitOpenError
+    # 半开状态下会占用一个试探名额, 之后必须调用success/failure/release之一
+    def allow(self, template: str) -> None:
+        with self.lock:
+            circuit = self.circuit(template)
+            self.update(circuit)
+            if circuit.state == CLOSED:
+                return
+            if circuit.state == HALF_OPEN and circuit.probing < self.BREAKER["probes"]:
+                circuit.probing += 1
+                return
+        raise CircuitOpenError(f"接口 {template} 已熔断, 暂停请求")
+
+    # 请求未得到结果(截止时间到达、被取消等)时调用, 归还allow中占用的试探名额
+    def release(self, template: str) -> None:
+        with self.lock:
+            circuit = self.circuit(template)
+            if circuit.state == HALF_OPEN and circuit.probing > 0:
+                circuit.probing -= 1
+
+    def success(self, template: str) -> None:
+        with self.lock:
+            circuit = self.circuit(template)
+            circuit.state = CLOSED
+            circuit.failures = 0
+            circuit.probing = 0
+
+    def failure(self, template: str) -> None:
+        with self.lock:
+            circuit = self.circuit(template)
+            circuit.failures += 1
+            if (
+                circuit.state == HALF_OPEN
+                or circuit.failures >= self.BREAKER["threshold"]
+            ):
+                circuit.state = OPEN
+                circuit.opened_at = time.monotonic()
+
+    # 接口当前状态, 调度时可据此跳过依赖故障接口的任务
+    def state(self, template: str) -> str:
+        with self.lock:
+            circuit = self.circuit(template)
+            self.update(circuit)
+            return circuit.state
+
+    def available(self, template: str) -> bool:
+        return self.state(template) != OPEN
+
+    def stats(self) -> Dict[str, Dict]:
+        with self.lock:
+            for circuit in self.circuits.values():
+                self.update(circuit)
+            return {
+                template: {"state": circuit.state, "failures": circuit.failures}
+                for template, circuit in self.circuits.items()
+            }
@@ -0,0 +1,151 @@
+import atexit
+import base64
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+import httpx
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from ..decorator import Singleton
+from . import codec as Codec
+from . import data as Data
+from . import tool as Tool
+
+# 缓存条目中保留的响应头, 用于条件请求和还原响应
+KEPT_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+# 只读接口的响应缓存, 按接口模板配置有效期, 超出容量时淘汰最久未使用的条目
+# 过期后若服务器给过ETag/Last-Modified则发起条件请求, 返回304时沿用缓存
+@Singleton
+class CodeMaoCache:
+    def __init__(self) -> None:
+        self.data = Data.CodeMaoData()
+        self.tool_process = Tool.CodeMaoProcess()
+        self.CACHE = self.data.PROGRAM_DATA["CACHE"]
+        self.path = Data.HTTP_CACHE_FILE_PATH
+        self.entries: OrderedDict[str, Dict] = OrderedDict()
+        self.counter = Counter()
+        self.lock = threading.Lock()
+        self.load()
+        atexit.register(self.save)
+
+    # 获取接口的缓存有效期, 未配置的接口不缓存
+    def ttl(self, url: str) -> Optional[float]:
+        return self.CACHE["ttl"].get(self.tool_process.process_template(url))
+
+    def key(self, url: str, params: Optional[Dict] = None) -> str:
+        if not params:
+            return url
+        query = sorted((k, v) for k, v in params.items() if v is not None)
+        return f"{url}?{urlencode(query)}"
+
+    # 查找缓存, 返回(条目, 是否仍在有效期内)
+    def lookup(self, key: str) -> Tuple[Optional[Dict], bool]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.counter["misses"] += 1
+                return None, False
+            self.entries.move_to_end(key)
+            fresh = time.time() - entry["stored"] < entry["ttl"]
+            self.counter["hits" if fresh else "stale"] += 1
+            return entry, fresh
+
+    # 为过期条目生成条件请求头
+    def conditional(self, entry: Dict) -> Dict[str, str]:
+        headers = {}
+        if "ETag" in entry["headers"]:
+            headers["If-None-Match"] = entry["headers"]["ETag"]
+        if "Last-Modified" in entry["headers"]:
+            headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+        return headers
+
+    def store(self, key: str, response: Any, ttl: float) -> None:
+        entry = {
+            "url": str(response.url),
+            "status": response.status_code,
+            "headers": {
+                name: response.headers[name]
+                for name in KEPT_HEADERS
+                if name in response.headers
+            },
+            "content": base64.b64encode(response.content).decode("ascii"),
+            "stored": time.time(),
+            "ttl": ttl,
+        }
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            self.counter["stores"] += 1
+            while len(self.entries) > self.CACHE["size"]:
+                self.entries.popitem(last=False)
+                self.counter["evictions"] += 1
+
+    # 服务器返回304, 刷新条目的存入时间
+    def refresh(self, key: str) -> None:
+        with self.lock:
+            if key in self.entries:
+                self.entries[key]["stored"] = time.time()
+                self.counter["revalidated"] += 1
+
+    # 由缓存条目还原requests响应
+    def build(self, entry: Dict) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response._content = base64.b64decode(entry["content"])
+        response.url = entry["url"]
+        response.encoding = "utf-8"
+        response.reason = "OK"
+        return response
+
+    # 由缓存条目还原httpx响应
+    def build_async(self, entry: Dict) -> httpx.Response:
+        return httpx.Response(
+            status_code=entry["status"],
+            headers=entry["headers"],
+            content=base64.b64decode(entry["content"]),
+            request=httpx.Request("GET", entry["url"]),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {**self.counter, "size": len(self.entries)}
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as file:
+                entries = Codec.decode(file.read())
+        except (OSError, ValueError) as err:
+            print(f"缓存文件读取失败: {err}")
+            return
+        now = time.time()
+        with self.lock:
+            for key, entry in entries.items():
+                # 没有校验信息的过期条目已无用处, 不再载入
+                if now - entry["stored"] < entry["ttl"] or entry["headers"].keys() & {
+                    "ETag",
+                    "Last-Modified",
+                }:
+                    self.entries[key] = entry
+
+    def save(self) -> None:
+        with self.lock:
+            entries = dict(self.entries)
+        try:
+            with open(self.path, "wb") as file:
+                file.write(Codec.encode(entries))
+        except OSError as err:
+            print(f"缓存文件写入失败: {err}")
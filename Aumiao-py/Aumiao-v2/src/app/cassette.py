@@ -0,0 +1,138 @@
+import base64
+import gzip
+import hashlib
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.exceptions import RequestException
+from requests.structures import CaseInsensitiveDict
+
+from . import codec as Codec
+
+# 响应体已解压保存, 这些头不再适用
+DROPPED_HEADERS = ("Content-Encoding", "Transfer-Encoding", "Content-Length")
+
+
+# 回放时录像带中没有对应的请求
+class CassetteMiss(RequestException):
+    pass
+
+
+# 录制/回放传输适配器, 挂载到会话后即可离线复现请求
+# record模式下请求照常发出, 同时记录请求与响应; replay模式下不访问网络, 按录制顺序返回响应
+# 录像带为gzip压缩的JSON Lines, 每行一个请求响应对
+class CassetteAdapter(BaseAdapter):
+    def __init__(
+        self,
+        path: str,
+        mode: str = "replay",
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        seed: Optional[int] = 0,
+    ) -> None:
+        super().__init__()
+        if mode not in ("record", "replay"):
+            raise ValueError("mode只能是record或replay")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.records = []
+        self.tracks: Dict[str, deque] = defaultdict(deque)
+        self.lock = threading.Lock()
+        self.real = HTTPAdapter() if mode == "record" else None
+        if mode == "replay":
+            self.load()
+
+    # 请求的匹配键: 方法、完整url(含查询参数)以及请求体摘要
+    def key(self, request: requests.PreparedRequest) -> str:
+        body = request.body or b""
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        digest = hashlib.sha1(body).hexdigest()[:12] if body else ""
+        return f"{request.method} {request.url} {digest}"
+
+    def send(
+        self, request: requests.PreparedRequest, stream: bool = False, **kwargs
+    ) -> requests.Response:
+        if self.mode == "record":
+            response = self.real.send(request, stream=False, **kwargs)
+            record = {
+                "key": self.key(request),
+                "status": response.status_code,
+                "reason": response.reason,
+                "headers": {
+                    name: value
+                    for name, value in response.headers.items()
+                    if name not in DROPPED_HEADERS
+                },
+                **self.dump_content(response.content),
+            }
+            with self.lock:
+                self.records.append(record)
+            return response
+        key = self.key(request)
+        with self.lock:
+            track = self.tracks.get(key)
+            if not track:
+                raise CassetteMiss(f"录像带中没有该请求: {key}", request=request)
+            # 同一请求录制了多次时按顺序返回, 用完后一直返回最后一次的响应
+            record = track.popleft() if len(track) > 1 else track[0]
+            delay = max(0.0, self.latency + self.random.uniform(-1, 1) * self.jitter)
+        if delay:
+            time.sleep(delay)
+        return self.build(request, record)
+
+    def build(
+        self, request: requests.PreparedRequest, record: Dict
+    ) -> requests.Response:
+        response = requests.Response()
+        response.status_code = record["status"]
+        response.reason = record["reason"]
+        response.headers = CaseInsensitiveDict(record["headers"])
+        response._content = self.load_content(record)
+        response._content_consumed = True
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        return response
+
+    # JSON等文本响应直接保存, 其余内容用base64保存
+    def dump_content(self, content: bytes) -> Dict[str, str]:
+        try:
+            return {"text": content.decode("utf-8")}
+        except UnicodeDecodeError:
+            return {"base64": base64.b64encode(content).decode("ascii")}
+
+    def load_content(self, record: Dict) -> bytes:
+        if "text" in record:
+            return record["text"].encode("utf-8")
+        return base64.b64decode(record["base64"])
+
+    def load(self) -> None:
+        with gzip.open(self.path, "rb") as file:
+            for line in file:
+                record = Codec.decode(line)
+                self.tracks[record["key"]].append(record)
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.lock:
+            records = list(self.records)
+        with gzip.open(self.path, "wb") as file:
+            for record in records:
+                file.write(Codec.encode(record) + b"\n")
+
+    def close(self) -> None:
+        if self.mode == "record":
+            self.save()
+            self.real.close()
@@ -0,0 +1,74 @@
+import hashlib
+import os
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from . import codec as Codec
+from . import data as Data
+
+
+# 翻页抓取的断点, 每个接口和参数对应一个文件, 程序中断或出错后再次抓取时从断点继续
+# 第一行为{"key": 接口与参数}, 之后每获取完一页追加一行:
+# {"next": 下一页的偏移量或页码, "limit": 每页数量, "items": 该页数据}
+# 写入中断导致的不完整行在读取时被截掉
+class CodeMaoCheckpoint:
+    def __init__(
+        self, url: str, params: Dict[str, any], directory: Optional[str] = None
+    ) -> None:
+        query = sorted((k, v) for k, v in params.items() if v is not None)
+        self.key = f"{url}?{urlencode(query)}"
+        name = hashlib.sha1(self.key.encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(directory or Data.CHECKPOINT_DIR_PATH, f"{name}.jsonl")
+
+    # 读取断点, 返回(下一页的偏移量或页码, 每页数量, 已获取的数据), 没有断点时返回(None, None, [])
+    def load(self) -> Tuple[Optional[int], Optional[int], List[Dict]]:
+        if not os.path.exists(self.path):
+            return None, None, []
+        try:
+            with open(self.path, "rb") as file:
+                lines = file.read().splitlines(keepends=True)
+        except OSError as err:
+            print(f"断点文件读取失败: {err}")
+            return None, None, []
+        try:
+            header = Codec.decode(lines[0]) if lines else None
+        except ValueError:
+            header = None
+        if not isinstance(header, dict) or header.get("key") != self.key:
+            self.clear()
+            return None, None, []
+        next_value, limit, items = None, None, []
+        size = len(lines[0])
+        for line in lines[1:]:
+            if not line.endswith(b"\n"):
+                break
+            try:
+                page = Codec.decode(line)
+            except ValueError:
+                break
+            next_value, limit = page["next"], page["limit"]
+            items.extend(page["items"])
+            size += len(line)
+        if size < sum(len(line) for line in lines):
+            os.truncate(self.path, size)
+        return next_value, limit, items
+
+    # 追加一页, 文件不存在时先写入第一行
+    def append(self, next_value: int, limit: int, items: List[Dict]) -> None:
+        page = {"next": next_value, "limit": limit, "items": items}
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            header = b""
+            if not os.path.exists(self.path):
+                header = Codec.encode({"key": self.key}) + b"\n"
+            with open(self.path, "ab") as file:
+                file.write(header + Codec.encode(page) + b"\n")
+        except OSError as err:
+            print(f"断点文件写入失败: {err}")
+
+    # 抓取完成后删除断点
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,153 @@
+import codecs
+import json
+from typing import Any, Iterable, Iterator
+
+# 安装了orjson时使用orjson编解码, 否则退回标准库json
+try:
+    import orjson
+except ModuleNotFoundError:
+    orjson = None
+
+BACKEND: str = "orjson" if orjson else "json"
+
+# requests(urllib3)与httpx在安装了brotli或brotlicffi时才能解压br
+try:
+    import brotli
+except ModuleNotFoundError:
+    try:
+        import brotlicffi as brotli
+    except ModuleNotFoundError:
+        brotli = None
+
+CONTENT_ENCODINGS = ("br", "gzip", "deflate") if brotli else ("gzip", "deflate")
+
+
+# 由偏好列表生成Accept-Encoding头, 丢弃当前环境无法解压的编码
+def accept_encoding(preferred: Iterable[str]) -> str:
+    encodings = [name for name in preferred if name in CONTENT_ENCODINGS]
+    return ", ".join(encodings) or "identity"
+
+
+# 将对象编码为UTF-8的JSON字节串
+# pretty为True时(写入配置等文件)始终使用标准库json缩进4格, 与是否安装orjson无关, 不改变文件原有格式
+def encode(obj: Any, pretty: bool = False) -> bytes:
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=4).encode("utf-8")
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+# 将JSON字节串或字符串解码为对象, 格式错误时抛出ValueError
+def decode(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# 数组中标量之后可能出现的字符
+SCALAR_END = frozenset(",]} \t\r\n")
+
+
+# 流式解析: 从字节块中逐个解出path(点分隔)指向的数组元素, 内存占用只与单个元素大小有关
+# orjson不支持增量解析, 这里使用标准库的raw_decode
+def iter_items(chunks: Iterable[bytes], path: str) -> Iterator[Any]:
+    keys = path.split(".")
+    chunks = iter(chunks)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    raw_decoder = json.JSONDecoder()
+    buffer = ""
+    finished = False
+
+    def fill() -> bool:
+        nonlocal buffer, finished
+        for chunk in chunks:
+            if chunk:
+                buffer += decoder.decode(chunk)
+                return True
+        if not finished:
+            buffer += decoder.decode(b"", final=True)
+            finished = True
+        return False
+
+    # 第一步: 找到目标数组的起始位置
+    pos = 0
+    depth = 0
+    matched = 0
+    key = None
+    string_start = None
+    escaped = False
+    while True:
+        if pos >= len(buffer):
+            if not fill():
+                return
+            continue
+        char = buffer[pos]
+        if string_start is not None:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                if depth == matched + 1:
+                    key = json.loads(buffer[string_start : pos + 1])
+                string_start = None
+        elif char == '"':
+            string_start = pos
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth < matched + 1:
+                return
+        elif char == ":" and depth == matched + 1 and key == keys[matched]:
+            # 跳过空白, 检查值的类型
+            pos += 1
+            while True:
+                if pos >= len(buffer) and not fill():
+                    return
+                if not buffer[pos].isspace():
+                    break
+                pos += 1
+            if matched == len(keys) - 1:
+                if buffer[pos] != "[":
+                    return
+                pos += 1
+                break
+            if buffer[pos] != "{":
+                continue
+            matched += 1
+            depth += 1
+        pos += 1
+        # 数组开始前的内容已无用, 保留尚未结束的字符串
+        if string_start is None and pos > 65536:
+            buffer = buffer[pos:]
+            pos = 0
+
+    # 第二步: 逐个解析数组元素
+    buffer = buffer[pos:]
+    while True:
+        stripped = buffer.lstrip(" \t\r\n,")
+        if not stripped:
+            buffer = ""
+            if not fill():
+                return
+            continue
+        buffer = stripped
+        if buffer[0] == "]":
+            return
+        try:
+            item, end = raw_decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if not fill():
+                raise
+            continue
+        # 数字等标量可能在字节块边界处被截断(如"1.5"只收到"1."), 其后出现分隔符才算完整
+        if (
+            buffer[0] not in '{["'
+            and (end == len(buffer) or buffer[end] not in SCALAR_END)
+            and fill()
+        ):
+            continue
+        yield item
+        buffer = buffer[end:]
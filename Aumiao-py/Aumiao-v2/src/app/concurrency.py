@@ -0,0 +1,181 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from ..decorator import Singleton
+from . import data as Data
+from . import limit as Limit
+
+
+# AIMD并发窗口: 限制同一主机同时进行的请求数, 默认关闭(AIMD["enabled"])
+# 请求正常完成时窗口加性增长(每个往返约增加increase), 出现429/5xx/连接失败时乘性减小(乘以decrease)
+# 一个往返内只减小一次; 延迟只用于估计往返时间, 单次请求的延迟抖动不会被当作拥塞
+# 窗口已满时按优先级排队, 有交互请求在等待时后台请求不会占用空出的位置
+class Window:
+    def __init__(self, config: Dict) -> None:
+        self.config = config
+        self.size = float(config["initial"])
+        self.in_flight = 0
+        self.peak = 0
+        self.latency: Optional[float] = None
+        self.decreased = 0.0
+        self.queued = Counter()
+        self.counter = Counter()
+        self.condition = threading.Condition()
+        self.waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    # 当前允许同时进行的请求数
+    def limit(self) -> int:
+        return max(int(self.size), 1)
+
+    # 窗口未满且没有更高优先级的请求在等待时, 该优先级的请求可以占用位置
+    def available(self, priority: str) -> bool:
+        if self.in_flight >= self.limit():
+            return False
+        higher = Limit.PRIORITIES[: Limit.PRIORITIES.index(priority)]
+        return not any(self.queued[name] for name in higher)
+
+    # 占用一个位置, 窗口已满时等待, 返回等待的秒数; 等到截止时间仍未轮到时返回None
+    def enter(
+        self, deadline: Optional[float] = None, priority: str = Limit.PRIORITIES[0]
+    ) -> Optional[float]:
+        if not self.config["enabled"]:
+            return 0.0
+        started = time.monotonic()
+        with self.condition:
+            self.queued[priority] += 1
+            try:
+                while not self.available(priority):
+                    remaining = (
+                        None if deadline is None else deadline - time.monotonic()
+                    )
+                    if remaining is not None and remaining <= 0:
+                        return None
+                    self.condition.wait(remaining)
+                return self.occupy(started)
+            finally:
+                self.leave_queue(priority)
+
+    async def enter_async(
+        self, deadline: Optional[float] = None, priority: str = Limit.PRIORITIES[0]
+    ) -> Optional[float]:
+        if not self.config["enabled"]:
+            return 0.0
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        with self.condition:
+            self.queued[priority] += 1
+        try:
+            while True:
+                with self.condition:
+                    if self.available(priority):
+                        return self.occupy(started)
+                    future = loop.create_future()
+                    self.waiters.append((loop, future))
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                try:
+                    await asyncio.wait_for(future, remaining)
+                except asyncio.TimeoutError:
+                    return None
+        finally:
+            with self.condition:
+                self.leave_queue(priority)
+
+    def occupy(self, started: float) -> float:
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        waited = time.monotonic() - started
+        self.counter["waited"] += waited
+        return waited
+
+    # 退出排队, 最后一个较高优先级的等待者离开后, 较低优先级的请求可能已经可以占用位置
+    def leave_queue(self, priority: str) -> None:
+        self.queued[priority] -= 1
+        if not self.queued[priority] and priority != Limit.PRIORITIES[-1]:
+            self.wake_all()
+
+    # 唤醒所有等待者重新检查, 需在持有condition时调用
+    def wake_all(self) -> None:
+        self.condition.notify_all()
+        waiters, self.waiters = self.waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(self.wake, future)
+
+    # 释放位置并根据结果调整窗口, latency为None时(如非网络异常)不调整
+    def leave(
+        self,
+        latency: Optional[float] = None,
+        status: Optional[int] = None,
+        failed: bool = False,
+    ) -> None:
+        if not self.config["enabled"]:
+            return
+        with self.condition:
+            self.in_flight -= 1
+            if latency is not None:
+                self.adjust(latency, status, failed)
+            self.wake_all()
+
+    @staticmethod
+    def wake(future: asyncio.Future) -> None:
+        if not future.done():
+            future.set_result(None)
+
+    def adjust(self, latency: float, status: Optional[int], failed: bool) -> None:
+        config = self.config
+        if failed or status == 429 or (status or 0) >= 500:
+            now = time.monotonic()
+            if now - self.decreased >= (self.latency or 0.0):
+                self.size = max(config["min"], self.size * config["decrease"])
+                self.decreased = now
+                self.counter["decreases"] += 1
+            return
+        # 平滑后的延迟作为往返时间的估计
+        self.latency = (
+            latency if self.latency is None else self.latency * 0.8 + latency * 0.2
+        )
+        if self.in_flight + 1 >= self.limit():
+            # 只有窗口被用满时才增长, 避免空闲时窗口无限扩大
+            self.size = min(config["max"], self.size + config["increase"] / self.size)
+            self.counter["increases"] += 1
+
+    def stats(self) -> Dict:
+        with self.condition:
+            return {
+                "window": self.limit(),
+                "size": self.size,
+                "in_flight": self.in_flight,
+                "peak": self.peak,
+                "latency": self.latency,
+                "increases": self.counter["increases"],
+                "decreases": self.counter["decreases"],
+                "waited": self.counter["waited"],
+            }
+
+
+# 按主机维护AIMD并发窗口, 配置见PROGRAM_DATA["AIMD"]
+@Singleton
+class CodeMaoConcurrency:
+    def __init__(self) -> None:
+        self.data = Data.CodeMaoData()
+        self.AIMD = self.data.PROGRAM_DATA["AIMD"]
+        self.windows: Dict[str, Window] = {}
+        self.lock = threading.Lock()
+
+    # url所属主机的并发窗口
+    def window(self, url: str) -> Window:
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.windows:
+                self.windows[host] = Window(self.AIMD)
+            return self.windows[host]
+
+    def stats(self) -> Dict[str, Dict]:
+        with self.lock:
+            windows = dict(self.windows)
+        return {host: window.stats() for host, window in windows.items()}
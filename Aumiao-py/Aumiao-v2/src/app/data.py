@@ -4,6 +4,9 @@ from . import file as File
 
 DATA_FILE_PATH: str = os.path.join(os.getcwd(), "data/" "data.json")
 CACHE_FILE_PATH: str = os.path.join(os.getcwd(), "data/" "cache.json")
+HTTP_CACHE_FILE_PATH: str = os.path.join(os.getcwd(), "data/" "http_cache.json")
+PAGE_LIMIT_FILE_PATH: str = os.path.join(os.getcwd(), "data/" "page_limits.json")
+CHECKPOINT_DIR_PATH: str = os.path.join(os.getcwd(), "data/" "checkpoints")
 
 
 class CodeMaoData:
@@ -23,6 +26,101 @@ class CodeMaoData:
         "BASE_URL": "",
         "SLOGAN": "",
         "SAVE_PATH": "",
+        "CONCURRENCY": 16,
+        "POOL": {
+            "connections": 10,
+            "maxsize": 10,
+            "block": False,
+        },
+        "RATE_LIMIT": {
+            "read": {
+                "rate": 10,
+                "burst": 10,
+            },
+            "message": {
+                "rate": 3,
+                "burst": 3,
+            },
+            "write": {
+                "rate": 2,
+                "burst": 2,
+            },
+            "delete": {
+                "rate": 1,
+                "burst": 2,
+            },
+        },
+        "CACHE": {
+            "size": 512,
+            "ttl": {
+                "/api/user/info/detail/{id}": 600,
+                "/creation-tools/v1/user/center/honor": 600,
+                "/creation-tools/v1/works/{id}": 600,
+                "/api/work/info/{id}": 600,
+                "/web/shops/{id}": 1800,
+            },
+        },
+        "RETRY": {
+            "retries": 3,
+            "base": 0.5,
+            "cap": 30,
+            "deadline": 60,
+            "jitter": True,
+        },
+        "BREAKER": {
+            "threshold": 5,
+            "reset": 30,
+            "probes": 1,
+        },
+        "TIMEOUT": {
+            "connect": 3.05,
+            "read": 15,
+        },
+        "PRIORITY": {
+            "default": "interactive",
+            "reserved": 1,
+        },
+        "COMPRESSION": [
+            "br",
+            "gzip",
+            "deflate",
+        ],
+        "DNS_TTL": 0,
+        "WARM_UP": {
+            "enabled": False,
+            "hosts": [
+                "https://api.codemao.cn",
+                "https://open-service.codemao.cn",
+                "https://shequ.codemao.cn",
+            ],
+            "timeout": 5,
+        },
+        "HTTP2": {
+            "enabled": False,
+            "prior_knowledge": False,
+        },
+        "BATCH": {
+            "window": 0.01,
+            "size": 20,
+        },
+        "AIMD": {
+            "enabled": False,
+            "initial": 4,
+            "min": 1,
+            "max": 32,
+            "increase": 1,
+            "decrease": 0.5,
+        },
+        "FAN_OUT": 4,
+        "PAGE_SIZE": {
+            "enabled": True,
+            "probe": 1000,
+            "limits": {},
+        },
+        "IDENTITY": {
+            "ttl": 600,
+            "size": 4096,
+        },
     }
 
     USER_DATA = {
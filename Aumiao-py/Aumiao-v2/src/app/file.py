@@ -1,6 +1,7 @@
-import json
 from typing import Dict
 
+from . import codec as Codec
+
 
 class CodeMaoError:
     # 检查文件
@@ -14,7 +15,7 @@ class CodeMaoError:
 
     def validate_json(self, json_string):
         try:
-            data = json.loads(json_string)
+            data = Codec.decode(json_string)
             return data
         except ValueError as err:
             print(err)
@@ -46,8 +47,6 @@ class CodeMaoFile:
 
                 file.write(text + "\n")
             elif type == "dict":
-                file.write(
-                    json.dumps(text, ensure_ascii=False, indent=4, sort_keys=False)
-                )
+                file.write(Codec.encode(text, pretty=True).decode("utf-8"))
             else:
                 raise ValueError("不支持的写入方法")
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict
+
+from ..decorator import Singleton
+
+
+class Call:
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: BaseException = None
+
+
+# 合并相同的并发请求: 同一key同时只执行一次, 其余调用者等待并拿到同一个结果
+@Singleton
+class CodeMaoFlight:
+    def __init__(self) -> None:
+        self.calls: Dict[str, Call] = {}
+        self.tasks: Dict[tuple, asyncio.Future] = {}
+        self.counter = Counter()
+        self.lock = threading.Lock()
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Call()
+                self.counter["executed"] += 1
+            else:
+                self.counter["saved"] += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as err:
+            call.error = err
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+
+    async def do_async(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        key = (id(asyncio.get_running_loop()), key)
+        with self.lock:
+            task = self.tasks.get(key)
+            if task is not None:
+                self.counter["saved"] += 1
+            else:
+                task = self.tasks[key] = asyncio.ensure_future(func())
+                task.add_done_callback(lambda _: self.tasks.pop(key, None))
+                self.counter["executed"] += 1
+        # 某个等待者被取消时不影响其他等待者
+        return await asyncio.shield(task)
+
+    # executed为实际发出的请求数, saved为被合并而省下的请求数
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {**self.counter, "in_flight": len(self.calls) + len(self.tasks)}
@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ..decorator import Singleton
+from . import data as Data
+
+
+# 实体表: 同一类型同一id的实体(用户、作品等)只保存一份
+# 不同接口返回的字段(投影)合并到同一个dict中, 各模块拿到的都是这份对象
+# 加载后ttl秒内再次获取同一投影时直接返回, 不再请求; 超出容量size时淘汰最久未使用的实体
+@Singleton
+class CodeMaoIdentity:
+    def __init__(self) -> None:
+        self.data = Data.CodeMaoData()
+        self.IDENTITY = self.data.PROGRAM_DATA["IDENTITY"]
+        self.entities: OrderedDict[Tuple[str, str], Dict] = OrderedDict()
+        # 各实体已加载的投影及加载时间
+        self.projections: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self.counter = Counter()
+        self.lock = threading.RLock()
+
+    # 已保存的实体, 不存在时返回None
+    def get(self, kind: str, id) -> Optional[Dict]:
+        with self.lock:
+            return self.entities.get((kind, str(id)))
+
+    # 合并一个实体并返回保存的那份对象, id_key为实体中id所在的字段
+    # nested为{字段: 类型}, 其中嵌套的实体(如评论中的用户)也会替换为保存的对象
+    def merge(
+        self,
+        kind: str,
+        entity: Dict,
+        id_key: str = "id",
+        nested: Optional[Dict[str, str]] = None,
+    ) -> Dict:
+        for field, nested_kind in (nested or {}).items():
+            if isinstance(entity.get(field), dict) and "id" in entity[field]:
+                entity[field] = self.merge(nested_kind, entity[field])
+        if id_key not in entity:
+            return entity
+        key = (kind, str(entity[id_key]))
+        with self.lock:
+            current = self.entities.get(key)
+            if current is None:
+                self.insert(key, entity)
+                return entity
+            self.entities.move_to_end(key)
+            if current is entity:
+                return entity
+            current.update(entity)
+            self.counter["merged"] += 1
+            self.counter["fields_avoided"] += len(entity)
+            return current
+
+    # 保存新实体, 超出容量时淘汰最久未使用的实体及其投影
+    def insert(self, key: Tuple[str, str], entity: Dict) -> None:
+        self.entities[key] = entity
+        while len(self.entities) > self.IDENTITY["size"]:
+            evicted, _ = self.entities.popitem(last=False)
+            self.projections.pop(evicted, None)
+            self.counter["evicted"] += 1
+
+    def merge_all(
+        self,
+        kind: str,
+        entities: List[Dict],
+        id_key: str = "id",
+        nested: Optional[Dict[str, str]] = None,
+    ) -> List[Dict]:
+        entities[:] = [self.merge(kind, entity, id_key, nested) for entity in entities]
+        return entities
+
+    # 获取实体的某个投影(如用户的detail、honor), ttl秒内获取过时直接返回保存的对象
+    # fetch返回接口数据, 合并后返回保存的对象
+    def load(
+        self,
+        kind: str,
+        id,
+        projection: str,
+        fetch: Callable[[], Dict],
+        id_key: str = "id",
+    ) -> Dict:
+        entity = self.loaded(kind, id, projection)
+        if entity is None:
+            entity = self.store(kind, id, projection, fetch(), id_key)
+        return entity
+
+    async def load_async(
+        self,
+        kind: str,
+        id,
+        projection: str,
+        fetch: Callable[[], Awaitable[Dict]],
+        id_key: str = "id",
+    ) -> Dict:
+        entity = self.loaded(kind, id, projection)
+        if entity is None:
+            entity = self.store(kind, id, projection, await fetch(), id_key)
+        return entity
+
+    def loaded(self, kind: str, id, projection: str) -> Optional[Dict]:
+        key = (kind, str(id))
+        with self.lock:
+            loaded_at = self.projections.get(key, {}).get(projection)
+            if (
+                loaded_at is None
+                or time.monotonic() - loaded_at >= self.IDENTITY["ttl"]
+            ):
+                return None
+            self.entities.move_to_end(key)
+            self.counter["fetches_avoided"] += 1
+            return self.entities[key]
+
+    def store(self, kind: str, id, projection: str, entity: Dict, id_key: str) -> Dict:
+        if not isinstance(entity, dict):
+            return entity
+        entity.setdefault(id_key, id)
+        entity = self.merge(kind, entity, id_key)
+        with self.lock:
+            key = (kind, str(entity[id_key]))
+            if key not in self.entities:
+                self.insert(key, entity)
+            self.projections.setdefault(key, {})[projection] = time.monotonic()
+        return entity
+
+    def reset(self) -> None:
+        with self.lock:
+            self.entities.clear()
+            self.projections.clear()
+            self.counter.clear()
+
+    # entities为保存的实体数, merged为合并的重复对象数, evicted为超出容量淘汰的实体数
+    # fetches_avoided为省去的请求数, fields_avoided为合并时省去的重复字段数
+    def stats(self) -> Dict:
+        with self.lock:
+            kinds = Counter(kind for kind, _ in self.entities)
+            return {
+                "kinds": dict(kinds),
+                "entities": len(self.entities),
+                "merged": self.counter["merged"],
+                "evicted": self.counter["evicted"],
+                "fetches_avoided": self.counter["fetches_avoided"],
+                "fields_avoided": self.counter["fields_avoided"],
+            }
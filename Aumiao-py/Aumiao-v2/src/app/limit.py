@@ -0,0 +1,244 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, Optional
+
+from ..decorator import Singleton
+from . import data as Data
+
+# 优先级从高到低, 低优先级请求只能使用高优先级请求用剩的额度
+PRIORITIES = ("interactive", "background")
+
+
+# 令牌桶: 每秒补充rate个令牌, 最多积攒burst个
+# 等待中的请求按优先级排队, 同一优先级内先到先得, 线程与协程共用同一把锁
+# 非最高优先级的请求需给交互请求留出reserved个令牌
+class TokenBucket:
+    def __init__(self, rate: float, burst: float, reserved: float = 0) -> None:
+        if rate <= 0 or burst < 1:
+            raise ValueError("rate必须大于0, burst不能小于1")
+        self.rate = rate
+        self.burst = burst
+        self.reserved = max(min(reserved, burst - 1), 0)
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.waited = 0.0
+        self.queues: Dict[str, Deque[object]] = {name: deque() for name in PRIORITIES}
+        self.classes = {
+            name: {"queued": 0, "peak": 0, "granted": 0, "waited": 0.0, "max_wait": 0.0}
+            for name in PRIORITIES
+        }
+        self.lock = threading.Lock()
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    # 排在该请求前面的请求数
+    def ahead(self, priority: str, ticket: Optional[object] = None) -> int:
+        count = 0
+        for name in PRIORITIES:
+            queue = self.queues[name]
+            if name == priority:
+                return count + (
+                    queue.index(ticket) if ticket is not None else len(queue)
+                )
+            count += len(queue)
+        return count
+
+    # 轮到该请求且有令牌时取走令牌并返回0, 否则返回预计需要等待的秒数
+    def poll(self, priority: str, ticket: object) -> float:
+        with self.lock:
+            now = time.monotonic()
+            self.refill(now)
+            ahead = self.ahead(priority, ticket)
+            floor = self.reserved if priority != PRIORITIES[0] else 0
+            wait = max(
+                (ahead + 1 + floor - self.tokens) / self.rate,
+                self.blocked_until - now,
+                0.0,
+            )
+            if ahead or wait > 0:
+                return max(wait, 0.001)
+            self.tokens -= 1
+            self.queues[priority].remove(ticket)
+            return 0.0
+
+    def enqueue(self, priority: str) -> object:
+        if priority not in self.queues:
+            raise ValueError(f"未知的优先级: {priority}")
+        ticket = object()
+        with self.lock:
+            self.queues[priority].append(ticket)
+            stats = self.classes[priority]
+            stats["queued"] = len(self.queues[priority])
+            stats["peak"] = max(stats["peak"], stats["queued"])
+        return ticket
+
+    def dequeue(self, priority: str, ticket: object, waited: float) -> None:
+        with self.lock:
+            stats = self.classes[priority]
+            if ticket in self.queues[priority]:
+                # 排队期间被取消, 不计入放行
+                self.queues[priority].remove(ticket)
+                stats["queued"] = len(self.queues[priority])
+                return
+            stats["queued"] = len(self.queues[priority])
+            stats["granted"] += 1
+            stats["waited"] += waited
+            stats["max_wait"] = max(stats["max_wait"], waited)
+            self.waited += waited
+
+    # 当前新请求需要等待的秒数(不排队)
+    def wait_time(self, priority: str = PRIORITIES[0]) -> float:
+        with self.lock:
+            now = time.monotonic()
+            self.refill(now)
+            floor = self.reserved if priority != PRIORITIES[0] else 0
+            return max(
+                (self.ahead(priority) + 1 + floor - self.tokens) / self.rate,
+                self.blocked_until - now,
+                0.0,
+            )
+
+    # 服务器要求退避时, 在seconds秒内不再放行, 并清空积攒的令牌
+    def penalize(self, seconds: float) -> None:
+        with self.lock:
+            now = time.monotonic()
+            self.refill(now)
+            self.blocked_until = max(self.blocked_until, now + seconds)
+            self.tokens = min(self.tokens, 0.0)
+
+    # 排队等待令牌, 返回实际等待的秒数
+    def acquire(self, priority: str = PRIORITIES[0]) -> float:
+        ticket = self.enqueue(priority)
+        started = time.monotonic()
+        try:
+            while wait := self.poll(priority, ticket):
+                time.sleep(wait)
+        finally:
+            waited = time.monotonic() - started
+            self.dequeue(priority, ticket, waited)
+        return waited
+
+    async def acquire_async(self, priority: str = PRIORITIES[0]) -> float:
+        ticket = self.enqueue(priority)
+        started = time.monotonic()
+        try:
+            while wait := self.poll(priority, ticket):
+                await asyncio.sleep(wait)
+        finally:
+            waited = time.monotonic() - started
+            self.dequeue(priority, ticket, waited)
+        return waited
+
+    # 各优先级的排队长度与等待时间
+    def class_stats(self) -> Dict[str, Dict]:
+        with self.lock:
+            return {name: dict(stats) for name, stats in self.classes.items()}
+
+
+# 按接口分组限速: 读取、信箱、写入、删除各用一个令牌桶
+@Singleton
+class CodeMaoLimiter:
+    def __init__(self) -> None:
+        self.data = Data.CodeMaoData()
+        self.RATE_LIMIT = self.data.PROGRAM_DATA["RATE_LIMIT"]
+        self.PRIORITY = self.data.PROGRAM_DATA["PRIORITY"]
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.lock = threading.Lock()
+
+    # 根据请求方法和url判断所属分组
+    def classify(self, method: str, url: str) -> str:
+        method = method.upper()
+        if method == "DELETE":
+            return "delete"
+        if "/web/message-record" in url:
+            return "message"
+        if method in ("GET", "HEAD", "OPTIONS"):
+            return "read"
+        return "write"
+
+    def bucket(self, group: str) -> TokenBucket:
+        with self.lock:
+            if group not in self.buckets:
+                config = self.RATE_LIMIT.get(group, self.RATE_LIMIT["read"])
+                self.buckets[group] = TokenBucket(
+                    config["rate"], config["burst"], self.PRIORITY["reserved"]
+                )
+            return self.buckets[group]
+
+    # priority为优先级, 不传则使用PRIORITY["default"]
+    def acquire(self, group: str, priority: Optional[str] = None) -> float:
+        return self.bucket(group).acquire(priority or self.PRIORITY["default"])
+
+    async def acquire_async(self, group: str, priority: Optional[str] = None) -> float:
+        return await self.bucket(group).acquire_async(
+            priority or self.PRIORITY["default"]
+        )
+
+    # 该分组当前需要等待的秒数
+    def wait_time(self, group: str, priority: Optional[str] = None) -> float:
+        return self.bucket(group).wait_time(priority or self.PRIORITY["default"])
+
+    # 处理429响应, 按Retry-After(秒数或HTTP日期)暂停该分组, 返回暂停秒数
+    def throttle(self, group: str, retry_after: Optional[str]) -> float:
+        seconds = parse_retry_after(retry_after)
+        if seconds is None:
+            seconds = 1 / self.bucket(group).rate
+        self.bucket(group).penalize(seconds)
+        return seconds
+
+    # 各分组的限速状态
+    def stats(self) -> Dict[str, Dict]:
+        with self.lock:
+            buckets = dict(self.buckets)
+        return {
+            group: {
+                "rate": bucket.rate,
+                "burst": bucket.burst,
+                "wait": bucket.wait_time(),
+                "waited": bucket.waited,
+                "priority": bucket.class_stats(),
+            }
+            for group, bucket in buckets.items()
+        }
+
+    # 按优先级汇总所有分组的排队长度与等待时间
+    def priority_stats(self) -> Dict[str, Dict]:
+        with self.lock:
+            buckets = list(self.buckets.values())
+        result = {
+            name: {"queued": 0, "peak": 0, "granted": 0, "waited": 0.0, "max_wait": 0.0}
+            for name in PRIORITIES
+        }
+        for bucket in buckets:
+            for name, stats in bucket.class_stats().items():
+                total = result[name]
+                total["queued"] += stats["queued"]
+                total["peak"] = max(total["peak"], stats["peak"])
+                total["granted"] += stats["granted"]
+                total["waited"] += stats["waited"]
+                total["max_wait"] = max(total["max_wait"], stats["max_wait"])
+        for total in result.values():
+            total["avg_wait"] = (
+                total["waited"] / total["granted"] if total["granted"] else 0.0
+            )
+        return result
+
+
+# 解析Retry-After头, 无法解析时返回None
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
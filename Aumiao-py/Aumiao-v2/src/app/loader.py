@@ -0,0 +1,142 @@
+import asyncio
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from . import data as Data
+
+
+# 批量加载器: 把window秒内的单个get(id)合并为批量请求, 每批不超过size个id
+# batch(ids)返回{id: 数据}, 结果按id分发给各个调用者, 没有返回的id得到None
+# 同一批内重复的id只请求一次; 批量请求出错时, 该批的所有调用者都会收到该异常
+# 批量请求被中断(KeyboardInterrupt、任务取消等)时, 尚未得到结果的调用者都会收到该异常
+# 线程中调用get, 协程中调用get_async(需要提供batch_async)
+class CodeMaoLoader:
+    def __init__(
+        self,
+        batch: Callable[[List[Hashable]], Dict[Hashable, Any]],
+        batch_async: Optional[
+            Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+        ] = None,
+        window: Optional[float] = None,
+        size: Optional[int] = None,
+    ) -> None:
+        config = Data.CodeMaoData().PROGRAM_DATA["BATCH"]
+        self.batch = batch
+        self.batch_async = batch_async
+        self.window = config["window"] if window is None else window
+        self.size = size or config["size"]
+        self.pending: Dict[Hashable, Future] = {}
+        self.timer: Optional[threading.Timer] = None
+        self.pending_async: Dict[asyncio.AbstractEventLoop, Dict] = {}
+        self.counter = Counter()
+        self.lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any:
+        with self.lock:
+            self.counter["calls"] += 1
+            future = self.pending.get(key)
+            if future is None:
+                future = self.pending[key] = Future()
+            full = len(self.pending) >= self.size
+            if full:
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+            elif self.timer is None:
+                self.timer = threading.Timer(self.window, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+        if full:
+            self.flush()
+        return future.result()
+
+    # 并发获取多个id, 返回与keys顺序一致的列表
+    def get_many(self, keys: List[Hashable]) -> List[Any]:
+        with self.lock:
+            self.counter["calls"] += len(keys)
+            futures = [self.pending.setdefault(key, Future()) for key in keys]
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+        self.flush()
+        return [future.result() for future in futures]
+
+    def flush(self) -> None:
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.timer = None
+        keys = list(pending)
+        for start in range(0, len(keys), self.size):
+            chunk = keys[start : start + self.size]
+            with self.lock:
+                self.counter["batches"] += 1
+            try:
+                result = self.batch(chunk)
+            except Exception as err:
+                for key in chunk:
+                    pending[key].set_exception(err)
+                continue
+            except BaseException as err:
+                # 中断等异常同样交给该批及之后各批的调用者, 避免它们一直等待, 然后继续抛出
+                for key in keys[start:]:
+                    pending[key].set_exception(err)
+                raise
+            for key in chunk:
+                pending[key].set_result(result.get(key))
+
+    async def get_async(self, key: Hashable) -> Any:
+        loop = asyncio.get_running_loop()
+        state = self.pending_async.setdefault(loop, {"futures": {}, "handle": None})
+        self.counter["calls"] += 1
+        future = state["futures"].get(key)
+        if future is None:
+            future = state["futures"][key] = loop.create_future()
+        if len(state["futures"]) >= self.size:
+            if state["handle"] is not None:
+                state["handle"].cancel()
+            self.dispatch_async(loop)
+        elif state["handle"] is None:
+            state["handle"] = loop.call_later(self.window, self.dispatch_async, loop)
+        return await asyncio.shield(future)
+
+    def dispatch_async(self, loop: asyncio.AbstractEventLoop) -> None:
+        state = self.pending_async.pop(loop, None)
+        if state and state["futures"]:
+            loop.create_task(self.flush_async(state["futures"]))
+
+    async def flush_async(self, pending: Dict[Hashable, asyncio.Future]) -> None:
+        keys = list(pending)
+        chunks = [keys[i : i + self.size] for i in range(0, len(keys), self.size)]
+        self.counter["batches"] += len(chunks)
+        try:
+            results = await asyncio.gather(
+                *(self.batch_async(chunk) for chunk in chunks), return_exceptions=True
+            )
+        except BaseException as err:
+            # 批量任务被取消等情况下, 同样通知所有调用者后继续抛出
+            for future in pending.values():
+                if future.done():
+                    continue
+                if isinstance(err, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(err)
+            raise
+        for chunk, result in zip(chunks, results):
+            for key in chunk:
+                if pending[key].done():
+                    continue
+                if isinstance(result, BaseException):
+                    pending[key].set_exception(result)
+                else:
+                    pending[key].set_result(result.get(key))
+
+    # calls为单个查询次数, batches为实际发出的批量请求数
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.counter["calls"],
+            "batches": self.counter["batches"],
+            "saved": max(self.counter["calls"] - self.counter["batches"], 0),
+        }
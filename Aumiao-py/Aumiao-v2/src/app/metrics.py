@@ -0,0 +1,168 @@
+import bisect
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, Optional
+
+from ..decorator import Singleton
+from . import codec as Codec
+
+# 延迟直方图的桶上界(秒), 最后一个桶收纳更慢的请求
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf"))
+# 每个接口保留最近的延迟样本数, 用于计算分位数
+SAMPLE_SIZE = 2048
+
+
+class EndpointMetrics:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.status = Counter()
+        self.errors = Counter()
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+        self.latency = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.bytes_wire = 0
+        self.items = 0
+        self.retries = 0
+        self.saved = 0
+        self.throttled = 0.0
+
+    def percentile(self, rank: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(rank * len(ordered)))]
+
+    def snapshot(self) -> Dict:
+        return {
+            "requests": self.requests,
+            "status": {str(code): count for code, count in self.status.items()},
+            "errors": dict(self.errors),
+            "latency": {
+                "total": self.latency,
+                "p50": self.percentile(0.50),
+                "p95": self.percentile(0.95),
+                "p99": self.percentile(0.99),
+                "histogram": {
+                    f"<={bound}": count
+                    for bound, count in zip(LATENCY_BUCKETS, self.buckets)
+                },
+            },
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_wire": self.bytes_wire,
+            "compression": self.bytes_in / self.bytes_wire if self.bytes_wire else None,
+            "items": self.items,
+            "bytes_per_item": self.bytes_wire / self.items if self.items else None,
+            "retries": self.retries,
+            "requests_saved": self.saved,
+            "throttled": self.throttled,
+        }
+
+
+# 按接口模板统计请求数、状态码、延迟分布、收发字节、重试次数与限速等待时间
+# bytes_in为解压后的响应字节数, bytes_wire为实际传输的(压缩后)字节数
+# 除了内置统计外, 还可以通过add_hook注册自定义的钩子, 每次请求结束后被调用
+@Singleton
+class CodeMaoMetrics:
+    def __init__(self) -> None:
+        self.endpoints: Dict[str, EndpointMetrics] = {}
+        self.hooks = []
+        self.started = time.time()
+        self.lock = threading.Lock()
+
+    def endpoint(self, template: str) -> EndpointMetrics:
+        if template not in self.endpoints:
+            self.endpoints[template] = EndpointMetrics()
+        return self.endpoints[template]
+
+    # hook(template, status, latency, bytes_in, bytes_out), status为None表示请求异常
+    def add_hook(self, hook) -> None:
+        self.hooks.append(hook)
+
+    def record(
+        self,
+        template: str,
+        status: Optional[int],
+        latency: float,
+        bytes_in: int = 0,
+        bytes_out: int = 0,
+        bytes_wire: Optional[int] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        with self.lock:
+            metrics = self.endpoint(template)
+            metrics.requests += 1
+            if status is not None:
+                metrics.status[status] += 1
+            if error is not None:
+                metrics.errors[error] += 1
+            metrics.buckets[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+            metrics.samples.append(latency)
+            metrics.latency += latency
+            metrics.bytes_in += bytes_in
+            metrics.bytes_out += bytes_out
+            metrics.bytes_wire += bytes_in if bytes_wire is None else bytes_wire
+        for hook in self.hooks:
+            hook(template, status, latency, bytes_in, bytes_out)
+
+    def record_retry(self, template: str) -> None:
+        with self.lock:
+            self.endpoint(template).retries += 1
+
+    # 记录分页接口返回的数据条数, 用于计算每条数据的传输字节数
+    def record_items(self, template: str, count: int) -> None:
+        with self.lock:
+            self.endpoint(template).items += count
+
+    # 记录翻页时省去的请求数(如复用首个响应、不预先读取总数)
+    def record_saved(self, template: str, count: int = 1) -> None:
+        with self.lock:
+            self.endpoint(template).saved += count
+
+    # 该接口每条数据平均的传输字节数, 尚无数据时返回None
+    def bytes_per_item(self, template: str) -> Optional[float]:
+        with self.lock:
+            metrics = self.endpoints.get(template)
+            if not metrics or not metrics.items:
+                return None
+            return metrics.bytes_wire / metrics.items
+
+    # 记录因限速而等待的秒数
+    def record_throttle(self, template: str, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        with self.lock:
+            self.endpoint(template).throttled += seconds
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self.lock:
+            return {
+                template: metrics.snapshot()
+                for template, metrics in sorted(self.endpoints.items())
+            }
+
+    # 按总耗时排序的接口列表, 用于找出最耗时的调用
+    def slowest(self, count: int = 10) -> Dict[str, float]:
+        with self.lock:
+            ranked = sorted(
+                self.endpoints.items(), key=lambda item: item[1].latency, reverse=True
+            )
+            return {template: metrics.latency for template, metrics in ranked[:count]}
+
+    def reset(self) -> None:
+        with self.lock:
+            self.endpoints.clear()
+            self.started = time.time()
+
+    # 导出为JSON文件, 一般在运行结束时调用
+    def dump(self, path: str) -> None:
+        report = {
+            "started": self.started,
+            "finished": time.time(),
+            "endpoints": self.snapshot(),
+        }
+        with open(path, "wb") as file:
+            file.write(Codec.encode(report, pretty=True))
@@ -0,0 +1,84 @@
+import os
+import threading
+from typing import Dict, Optional
+
+from ..decorator import Singleton
+from . import codec as Codec
+from . import data as Data
+
+
+# 各接口实际接受的最大每页数量, PROGRAM_DATA["PAGE_SIZE"]["limits"]中为手动指定的上限
+# 试探得到的上限保存在单独的状态文件(PAGE_LIMIT_FILE_PATH)中, 不改写配置文件, 两者都有时以试探结果为准
+# 上限未知时翻页请求以probe为每页数量试探, 服务器静默截断时返回的条数即为上限
+@Singleton
+class CodeMaoPageSize:
+    def __init__(self) -> None:
+        self.data = Data.CodeMaoData()
+        self.PAGE_SIZE = self.data.PROGRAM_DATA["PAGE_SIZE"]
+        self.path = Data.PAGE_LIMIT_FILE_PATH
+        self.learned: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    # 已知的每页上限, 未知时返回None
+    def known(self, template: str) -> Optional[int]:
+        return self.learned.get(template, self.PAGE_SIZE["limits"].get(template))
+
+    # 是否需要试探该接口的每页上限
+    def probing(self, template: str) -> bool:
+        return self.PAGE_SIZE["enabled"] and self.known(template) is None
+
+    # 本次翻页使用的每页数量: 已知上限时使用上限, 未知且probe为True时使用probe, 未启用时原样返回
+    def limit(self, template: str, requested: int, probe: bool = True) -> int:
+        if not self.PAGE_SIZE["enabled"]:
+            return requested
+        known = self.known(template)
+        if known is None:
+            return max(requested, self.PAGE_SIZE["probe"]) if probe else requested
+        return max(requested, known)
+
+    # 由首个响应判断每页上限: 返回的条数少于请求数量且总数更多时, 返回的条数即为上限
+    # 返回的条数等于请求数量时, 上限不小于请求数量; 总数不足请求数量时无法判断
+    def observe(self, template: str, requested: int, returned: int, total: int) -> None:
+        if not self.PAGE_SIZE["enabled"]:
+            return
+        if 0 < returned < min(requested, total):
+            self.record(template, returned)
+        elif returned == requested and requested > (self.known(template) or 0):
+            self.record(template, requested)
+
+    # 服务器拒绝rejected条/页而接受accepted条/页时调用
+    # 试探的数量或已记录的上限被拒绝时, 将上限降为accepted, 之后不再以被拒绝的数量请求
+    def reject(self, template: str, rejected: int, accepted: int) -> None:
+        if not self.PAGE_SIZE["enabled"] or accepted >= rejected:
+            return
+        known = self.known(template)
+        if known is None or known >= rejected:
+            self.record(template, accepted)
+
+    # 记录每页上限, 有变化时写回状态文件
+    def record(self, template: str, limit: int) -> None:
+        with self.lock:
+            if self.learned.get(template) == limit:
+                return
+            self.learned[template] = limit
+            self.save()
+
+    def load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as file:
+                learned = Codec.decode(file.read())
+        except (OSError, ValueError) as err:
+            print(f"每页数量文件读取失败: {err}")
+            return
+        if isinstance(learned, dict):
+            self.learned.update(learned)
+
+    def save(self) -> None:
+        try:
+            with open(self.path, "wb") as file:
+                file.write(Codec.encode(self.learned))
+        except OSError as err:
+            print(f"每页数量文件写入失败: {err}")
@@ -0,0 +1,233 @@
+import logging
+import socket
+import threading
+import time
+import weakref
+from collections import Counter
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+from ..decorator import Singleton
+from . import codec as Codec
+from . import data as Data
+from . import transport as Transport
+
+
+# urllib3在连接池已满时会丢弃连接并打出警告, 借此统计每个主机的连接池耗尽次数
+class PoolFullHandler(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__(level=logging.WARNING)
+        self.counter = Counter()
+        self.lock = threading.Lock()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if str(record.msg).startswith("Connection pool is full"):
+            host = record.args[0] if record.args else "unknown"
+            with self.lock:
+                self.counter[host] += 1
+
+
+# 进程内的DNS缓存: 替换socket.getaddrinfo, 相同参数的解析结果在ttl秒内直接复用
+# requests(urllib3)与httpx(asyncio)建立连接时都经由socket.getaddrinfo解析, 解析失败不缓存
+# 替换是全局的, 会影响进程内的所有解析, 因此默认关闭(DNS_TTL为0), 需要时在配置中开启
+class DNSCache:
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self.entries: Dict[tuple, tuple] = {}
+        self.counter = Counter()
+        self.resolve = None
+        self.lock = threading.Lock()
+
+    def getaddrinfo(self, host, port, *args, **kwargs) -> list:
+        key = (host, port, args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > now:
+                self.counter["hits"] += 1
+                return list(entry[1])
+        started = time.perf_counter()
+        result = self.resolve(host, port, *args, **kwargs)
+        with self.lock:
+            self.entries[key] = (now + self.ttl, tuple(result))
+            self.counter["misses"] += 1
+            self.counter["resolve_time"] += time.perf_counter() - started
+        return result
+
+    def install(self) -> None:
+        if self.resolve is None:
+            self.resolve = socket.getaddrinfo
+            socket.getaddrinfo = self.getaddrinfo
+
+    def uninstall(self) -> None:
+        if self.resolve is not None:
+            socket.getaddrinfo = self.resolve
+            self.resolve = None
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                "ttl": self.ttl,
+                "entries": len(self.entries),
+                "hits": self.counter["hits"],
+                "misses": self.counter["misses"],
+                "resolve_time": self.counter["resolve_time"],
+            }
+
+
+# 为每个线程提供独立的requests会话, 所有会话共用同一个cookie罐
+@Singleton
+class CodeMaoSession:
+    def __init__(self) -> None:
+        self.data = Data.CodeMaoData()
+        self.POOL = self.data.PROGRAM_DATA["POOL"]
+        self.HTTP2 = self.data.PROGRAM_DATA["HTTP2"]
+        self.http2: Optional[Transport.HTTP2Adapter] = None
+        self.cookies = requests.cookies.RequestsCookieJar()
+        self.local = threading.local()
+        self.sessions = weakref.WeakSet()
+        self.lock = threading.Lock()
+        self.transport: Optional[BaseAdapter] = None
+        self.pool_full = PoolFullHandler()
+        logging.getLogger("urllib3.connectionpool").addHandler(self.pool_full)
+        self.WARM_UP = self.data.PROGRAM_DATA["WARM_UP"]
+        self.dns = DNSCache(self.data.PROGRAM_DATA["DNS_TTL"])
+        if self.dns.ttl > 0:
+            self.dns.install()
+        self.warmed: Dict[str, Dict] = {}
+
+    # 按配置创建连接池适配器, 挂载了自定义传输适配器时使用该适配器
+    # 启用HTTP2时所有会话共用一个HTTP/2适配器
+    def create_adapter(self) -> BaseAdapter:
+        if self.transport is not None:
+            return self.transport
+        if self.HTTP2["enabled"]:
+            with self.lock:
+                if self.http2 is None:
+                    self.http2 = Transport.HTTP2Adapter(
+                        self.cookies,
+                        self.POOL["maxsize"],
+                        self.HTTP2["prior_knowledge"],
+                    )
+                return self.http2
+        return HTTPAdapter(
+            pool_connections=self.POOL["connections"],
+            pool_maxsize=self.POOL["maxsize"],
+            pool_block=self.POOL["block"],
+        )
+
+    # 获取当前线程的会话, 不存在则创建
+    def get(self) -> requests.Session:
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.cookies = self.cookies
+            session.headers["Accept-Encoding"] = Codec.accept_encoding(
+                self.data.PROGRAM_DATA["COMPRESSION"]
+            )
+            adapter = self.create_adapter()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self.local.session = session
+            with self.lock:
+                self.sessions.add(session)
+        return session
+
+    # 调整连接池大小或切换HTTP/2, 已创建的会话会重新挂载适配器
+    def configure(
+        self,
+        connections: int = None,
+        maxsize: int = None,
+        block: bool = None,
+        http2: bool = None,
+    ) -> None:
+        for key, value in (
+            ("connections", connections),
+            ("maxsize", maxsize),
+            ("block", block),
+        ):
+            if value is not None:
+                self.POOL[key] = value
+        if http2 is not None:
+            self.HTTP2["enabled"] = http2
+        if self.http2 is not None:
+            self.http2.shutdown()
+            self.http2 = None
+        self.remount()
+
+    # 为所有会话(包括之后创建的)挂载自定义传输适配器, 如录制/回放适配器
+    # 传入None恢复为默认的连接池适配器
+    def mount(self, transport: Optional[BaseAdapter]) -> None:
+        self.transport = transport
+        self.remount()
+
+    def remount(self) -> None:
+        with self.lock:
+            sessions = list(self.sessions)
+        for session in sessions:
+            adapter = self.create_adapter()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+
+    # 在当前线程的会话中解析并连接host, 建立的长连接留在该会话的连接池中
+    # 返回耗时: dns为解析耗时, connect为建立连接并收到响应头的耗时
+    def connect(self, host: str) -> Dict:
+        session = self.get()
+        parsed = urlparse(host)
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        timing = {}
+        started = time.perf_counter()
+        try:
+            socket.getaddrinfo(parsed.hostname, port, 0, socket.SOCK_STREAM)
+            timing["dns"] = time.perf_counter() - started
+            response = session.head(
+                host, timeout=self.WARM_UP["timeout"], allow_redirects=False
+            )
+            response.close()
+            timing["connect"] = time.perf_counter() - started - timing["dns"]
+            timing["status"] = response.status_code
+        except (OSError, requests.RequestException) as err:
+            timing["error"] = type(err).__name__
+        timing["total"] = time.perf_counter() - started
+        return timing
+
+    # 依次连接hosts(默认为WARM_UP["hosts"]), 只预热调用线程的会话, 结果可在stats()中查看
+    # 会话按线程划分且不能跨线程共用, 需在之后发出请求的线程中调用
+    # 同时预热fan_out线程池与异步会话见CodeMaoClient.warm_up
+    def warm_up(self, hosts: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        timings = {host: self.connect(host) for host in hosts or self.WARM_UP["hosts"]}
+        self.warmed.update(timings)
+        return timings
+
+    # 更新所有会话共用的cookie
+    def update_cookie(self, cookie: Dict) -> None:
+        self.cookies.update(cookie)
+
+    # 连接池状态
+    def stats(self) -> Dict:
+        with self.lock:
+            sessions = len(self.sessions)
+        with self.pool_full.lock:
+            exhausted = dict(self.pool_full.counter)
+        return {
+            **self.POOL,
+            "http2": self.HTTP2["enabled"],
+            "sessions": sessions,
+            "exhausted": exhausted,
+            "dns": self.dns.stats(),
+            "warm_up": dict(self.warmed),
+        }
+
+    # 关闭当前线程的会话
+    def close(self) -> None:
+        session = getattr(self.local, "session", None)
+        if session is not None:
+            session.close()
+            self.local.session = None
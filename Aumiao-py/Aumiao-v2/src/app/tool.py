@@ -1,5 +1,6 @@
 import time
 from typing import Any, Dict, List
+from urllib.parse import urlparse
 
 
 class CodeMaoProcess:
@@ -44,6 +45,15 @@ class CodeMaoProcess:
             value = value.get(key, {})
         return value
 
+    # 将url转换为接口模板, 路径中的数字段替换为{id}
+    # 如 https://api.codemao.cn/creation-tools/v1/works/123/comments
+    # -> /creation-tools/v1/works/{id}/comments
+    def process_template(self, url: str) -> str:
+        path = urlparse(url).path
+        return "/".join(
+            "{id}" if item.isdigit() else item for item in path.rstrip("/").split("/")
+        )
+
     # 将cookie转换为headers中显示的形式
     def process_cookie(self, cookie):
         cookie_str = "; ".join([f"{key}={value}" for key, value in cookie.items()])
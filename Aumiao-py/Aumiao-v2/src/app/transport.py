@@ -0,0 +1,126 @@
+import threading
+from http.client import HTTPMessage
+from typing import Iterator, Optional
+
+import httpx
+import requests
+from requests.adapters import BaseAdapter
+from requests.cookies import MockRequest, MockResponse, RequestsCookieJar
+from requests.structures import CaseInsensitiveDict
+
+
+# 供requests读取的响应体, 包装httpx的响应
+# tell()为实际从连接读取的(压缩后)字节数, 与urllib3响应保持一致
+class HTTP2Body:
+    def __init__(self, response: httpx.Response) -> None:
+        self.response = response
+
+    def stream(self, chunk_size: int = 65536, decode_content: bool = True) -> Iterator:
+        yield from self.response.iter_bytes(chunk_size)
+
+    def read(self, amt: Optional[int] = None, **kwargs) -> bytes:
+        return self.response.read()
+
+    def tell(self) -> int:
+        return self.response.num_bytes_downloaded
+
+    def close(self) -> None:
+        self.response.close()
+
+    def release_conn(self) -> None:
+        self.response.close()
+
+
+# 基于httpx的HTTP/2传输适配器, 所有线程的会话共用一个httpx.Client
+# 同一主机的并发请求在一条连接上多路复用, 服务器不支持HTTP/2时自动退回HTTP/1.1
+# prior_knowledge为True时不经协商直接以HTTP/2通信(h2c), 仅用于不带TLS的本地测试
+class HTTP2Adapter(BaseAdapter):
+    def __init__(
+        self,
+        cookies: RequestsCookieJar,
+        max_connections: int = 10,
+        prior_knowledge: bool = False,
+    ) -> None:
+        super().__init__()
+        self.cookies = cookies
+        self.client = httpx.Client(
+            http1=not prior_knowledge,
+            http2=True,
+            limits=httpx.Limits(max_connections=max_connections),
+            timeout=None,
+        )
+        self.lock = threading.Lock()
+
+    def send(
+        self,
+        request: requests.PreparedRequest,
+        stream: bool = False,
+        timeout=None,
+        **kwargs,
+    ) -> requests.Response:
+        # 请求头中已带有会话的cookie, 直接构造请求而不经过httpx.Client的cookie处理
+        http_request = httpx.Request(
+            request.method,
+            request.url,
+            headers=list(request.headers.items()),
+            content=request.body,
+        )
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            http_request.extensions["timeout"] = httpx.Timeout(
+                read, connect=connect
+            ).as_dict()
+        elif timeout is not None:
+            http_request.extensions["timeout"] = httpx.Timeout(timeout).as_dict()
+        try:
+            http_response = self.client.send(http_request, stream=True)
+            if not stream:
+                http_response.read()
+        except httpx.ConnectTimeout as err:
+            raise requests.ConnectTimeout(err, request=request)
+        except httpx.TimeoutException as err:
+            raise requests.ReadTimeout(err, request=request)
+        except httpx.TransportError as err:
+            raise requests.ConnectionError(err, request=request)
+        return self.build(request, http_response, stream)
+
+    def build(
+        self,
+        request: requests.PreparedRequest,
+        http_response: httpx.Response,
+        stream: bool,
+    ) -> requests.Response:
+        response = requests.Response()
+        response.status_code = http_response.status_code
+        response.reason = http_response.reason_phrase
+        response.headers = CaseInsensitiveDict(http_response.headers)
+        response.raw = HTTP2Body(http_response)
+        if not stream:
+            response._content = http_response.content
+            response._content_consumed = True
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.http_version = http_response.http_version
+        self.extract_cookies(request, http_response)
+        return response
+
+    # requests只能从urllib3响应中提取cookie, 这里手动写入会话共用的cookie
+    def extract_cookies(
+        self, request: requests.PreparedRequest, http_response: httpx.Response
+    ) -> None:
+        values = http_response.headers.get_list("set-cookie")
+        if not values:
+            return
+        message = HTTPMessage()
+        for value in values:
+            message["Set-Cookie"] = value
+        with self.lock:
+            self.cookies.extract_cookies(MockResponse(message), MockRequest(request))
+
+    # 各线程的会话关闭时也会调用close, 共用的连接在shutdown时才关闭
+    def close(self) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        self.client.close()
@@ -1,8 +1,8 @@
-import json
 import uuid
 from typing import Any, Dict, List, Optional
 
 import src.app.acquire as Acquire
+import src.app.codec as Codec
 import src.app.data as Data
 import src.app.tool as Tool
 
@@ -32,7 +32,7 @@ class Login:
         response = self.acquire.send_request(
             url="/tiger/v3/web/accounts/login",
             method="post",
-            data=json.dumps(
+            data=Codec.encode(
                 {
                     "identity": identity,
                     "password": password,
@@ -54,7 +54,7 @@ class Login:
         response = self.acquire.send_request(
             url="/nemo/v2/works/174408420/like",
             method="post",
-            data=json.dumps({}),
+            data=Codec.encode({}),
             headers={**self.data.PROGRAM_DATA["HEADERS"], "cookie": cookies},
         )
         self.check_login(response)
@@ -106,7 +106,7 @@ class Login:
     # 退出登录
     def logout(self):
         response = self.acquire.send_request(
-            url="/tiger/v3/web/accounts/logout", method="post", data=json.dumps({})
+            url="/tiger/v3/web/accounts/logout", method="post", data=Codec.encode({})
         )
         return response.status_code == 204
 
@@ -119,7 +119,7 @@ class Login:
         pid: str = "65edCTyg",
         agreement_ids: List = [-1],
     ):
-        data = json.dumps(
+        data = Codec.encode(
             {
                 "identity": identity,
                 "password": password,
@@ -133,7 +133,7 @@ class Login:
             data=data,
             headers={**self.data.PROGRAM_DATA["HEADERS"], "x-captcha-ticket": ticket},
         )
-        return response.json()
+        return Codec.decode(response.content)
 
     #
     # 登录ticket获取
@@ -145,7 +145,7 @@ class Login:
         pid: str = "65edCTyg",
         deviced=None,
     ):
-        data = json.dumps(
+        data = Codec.encode(
             {
                 "identity": identity,
                 "scene": scence,
@@ -159,7 +159,7 @@ class Login:
             method="post",
             data=data,
         )
-        return response.json()
+        return Codec.decode(response.content)
 
 
 class Obtain:
@@ -172,7 +172,7 @@ class Obtain:
             method="get",
             url="/api/user/random/nickname",
         )
-        return response.json()["data"]["nickname"]
+        return Codec.decode(response.content)["data"]["nickname"]
 
     # 获取新回复(传入参数就获取前*个回复,若没传入就获取新回复数量, 再获取新回复数量个回复)
     def get_replies(self, limit: int = 0) -> List[Dict[str, Any]]:
@@ -181,7 +181,7 @@ class Obtain:
             url="/web/message-record/count",
             method="get",
         )
-        reply_num = record.json()[0]["count"]
+        reply_num = Codec.decode(record.content)[0]["count"]
         if reply_num == limit == 0:
             return [{}]
         result_num = reply_num if limit == 0 else limit
@@ -197,7 +197,7 @@ class Obtain:
                 method="get",
                 params=params,
             )
-            _list.extend(response.json()["items"][:result_num])
+            _list.extend(Codec.decode(response.content)["items"][:result_num])
             result_num -= list_num
             if result_num <= 0:
                 break
@@ -213,7 +213,7 @@ class Obtain:
                 url="/web/message-record/count",
                 method="get",
             )
-            counts = [record.json()[i]["count"] for i in range(3)]
+            counts = [Codec.decode(record.content)[i]["count"] for i in range(3)]
             if all(count == 0 for count in counts):
                 return True  # 所有消息类型处理完毕
 
@@ -248,7 +248,7 @@ class Obtain:
             method="get",
             params=params,
         )  # 为防止封号,limit建议调大
-        _dict = response.json()["items"]
+        _dict = Codec.decode(response.content)["items"]
         return _dict
 
     # 获取时间戳
@@ -256,4 +256,66 @@ class Obtain:
         response = self.acquire.send_request(
             url="/coconut/clouddb/currentTime", method="get"
         )
-        return response.json()
+        return Codec.decode(response.content)
+
+
+class AsyncObtain:
+    def __init__(self) -> None:
+        self.acquire = Acquire.AsyncCodeMaoClient()
+
+    # 获取随机昵称
+    async def get_name_random(self) -> str:
+        response = await self.acquire.send_request(
+            method="get",
+            url="/api/user/random/nickname",
+        )
+        return Codec.decode(response.content)["data"]["nickname"]
+
+    # 获取新回复(传入参数就获取前*个回复,若没传入就获取新回复数量, 再获取新回复数量个回复)
+    async def get_replies(self, limit: int = 0) -> List[Dict[str, Any]]:
+        _list = []
+        record = await self.acquire.send_request(
+            url="/web/message-record/count",
+            method="get",
+        )
+        reply_num = Codec.decode(record.content)[0]["count"]
+        if reply_num == limit == 0:
+            return [{}]
+        result_num = reply_num if limit == 0 else limit
+        while True:
+            list_num = sorted([5, result_num, 200])[1]
+            params = {
+                "query_type": "COMMENT_REPLY",
+                "limit": list_num,
+            }
+            response = await self.acquire.send_request(
+                url="/web/message-record",
+                method="get",
+                params=params,
+            )
+            _list.extend(Codec.decode(response.content)["items"][:result_num])
+            result_num -= list_num
+            if result_num <= 0:
+                break
+        return _list
+
+    # 获取作品
+    async def get_works(self, method: str, limit: int, offset: int = 0):
+        params = {"limit": limit, "offset": offset}
+        if method == "subject":
+            url = "/creation-tools/v1/pc/discover/subject-work"
+        elif method == "newest":
+            url = "/creation-tools/v1/pc/discover/newest-work"
+        response = await self.acquire.send_request(
+            url=url,
+            method="get",
+            params=params,
+        )
+        return Codec.decode(response.content)["items"]
+
+    # 获取时间戳
+    async def get_timestamp(self):
+        response = await self.acquire.send_request(
+            url="/coconut/clouddb/currentTime", method="get"
+        )
+        return Codec.decode(response.content)
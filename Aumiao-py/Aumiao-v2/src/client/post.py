@@ -1,11 +1,14 @@
-from typing import List
+from typing import AsyncIterator, Dict, Iterator, List, Optional
 
 import src.app.acquire as acquire
+import src.app.codec as codec
+import src.app.loader as loader
 
 
 class Obtain:
     def __init__(self) -> None:
         self.acquire = acquire.CodeMaoClient()
+        self.post_loader = loader.CodeMaoLoader(self.load_posts)
 
     # 获取多个帖子信息
     def get_posts_detials(self, ids: int | List):
@@ -16,18 +19,32 @@ class Obtain:
         response = self.acquire.send_request(
             url="/web/forums/posts/all", method="get", params=params
         )
-        return response.json()
+        return codec.decode(response.content)
+
+    # 批量获取帖子信息, 返回{帖子id: 帖子信息}
+    def load_posts(self, ids: List[str]) -> Dict[str, Dict]:
+        items = self.get_posts_detials(list(ids))["items"]
+        return {str(item["id"]): item for item in items}
+
+    # 获取帖子信息, 多个线程短时间内的调用会合并为一次批量请求
+    def get_post(self, id: int | str) -> Optional[Dict]:
+        return self.post_loader.get(str(id))
 
     # 获取单个帖子信息
     def get_single_detials(self, id: int):
         response = self.acquire.send_request(
             url=f"/web/forums/posts/{id}/details", method="get"
         )
-        return response.json()
+        return codec.decode(response.content)
 
     # 获取帖子回复
     def get_post_replies(
-        self, id: int, page: int = 1, limit: int = 10, sort: str = "-created_at"
+        self,
+        id: int,
+        page: int = 1,
+        limit: int = 10,
+        sort: str = "-created_at",
+        deadline: Optional[float] = None,
     ):
         params = {"page": page, "limit": limit, "sort": sort}
         replies = self.acquire.fetch_all_data(
@@ -37,5 +54,100 @@ class Obtain:
             data_key="items",
             method="page",
             args={"amount": "limit", "remove": "page"},
+            deadline=deadline,
         )
         return replies
+
+    # 逐条获取帖子回复, 调用方停止迭代后不再请求后面的分页
+    def iter_post_replies(
+        self,
+        id: int,
+        page: int = 1,
+        limit: int = 10,
+        sort: str = "-created_at",
+        deadline: Optional[float] = None,
+    ) -> Iterator[Dict]:
+        params = {"page": page, "limit": limit, "sort": sort}
+        return self.acquire.iter_all_data(
+            url=f"/web/forums/posts/{id}/replies",
+            params=params,
+            total_key="total",
+            data_key="items",
+            method="page",
+            args={"amount": "limit", "remove": "page"},
+            deadline=deadline,
+        )
+
+
+class AsyncObtain:
+    def __init__(self) -> None:
+        self.acquire = acquire.AsyncCodeMaoClient()
+        self.post_loader = loader.CodeMaoLoader(None, self.load_posts)
+
+    # 获取多个帖子信息
+    async def get_posts_detials(self, ids: int | List):
+        if isinstance(ids, int):
+            params = {"ids": ids}
+        elif isinstance(ids, List):
+            params = {"ids": ",".join(map(str, ids))}
+        response = await self.acquire.send_request(
+            url="/web/forums/posts/all", method="get", params=params
+        )
+        return codec.decode(response.content)
+
+    # 批量获取帖子信息, 返回{帖子id: 帖子信息}
+    async def load_posts(self, ids: List[str]) -> Dict[str, Dict]:
+        items = (await self.get_posts_detials(list(ids)))["items"]
+        return {str(item["id"]): item for item in items}
+
+    # 获取帖子信息, 多个协程短时间内的调用会合并为一次批量请求
+    async def get_post(self, id: int | str) -> Optional[Dict]:
+        return await self.post_loader.get_async(str(id))
+
+    # 获取单个帖子信息
+    async def get_single_detials(self, id: int):
+        response = await self.acquire.send_request(
+            url=f"/web/forums/posts/{id}/details", method="get"
+        )
+        return codec.decode(response.content)
+
+    # 获取帖子回复
+    async def get_post_replies(
+        self,
+        id: int,
+        page: int = 1,
+        limit: int = 10,
+        sort: str = "-created_at",
+        deadline: Optional[float] = None,
+    ):
+        params = {"page": page, "limit": limit, "sort": sort}
+        replies = await self.acquire.fetch_all_data(
+            url=f"/web/forums/posts/{id}/replies",
+            params=params,
+            total_key="total",
+            data_key="items",
+            method="page",
+            args={"amount": "limit", "remove": "page"},
+            deadline=deadline,
+        )
+        return replies
+
+    # 逐条获取帖子回复, 调用方停止迭代后不再请求后面的分页
+    def iter_post_replies(
+        self,
+        id: int,
+        page: int = 1,
+        limit: int = 10,
+        sort: str = "-created_at",
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[Dict]:
+        params = {"page": page, "limit": limit, "sort": sort}
+        return self.acquire.iter_all_data(
+            url=f"/web/forums/posts/{id}/replies",
+            params=params,
+            total_key="total",
+            data_key="items",
+            method="page",
+            args={"amount": "limit", "remove": "page"},
+            deadline=deadline,
+        )
@@ -1,7 +1,7 @@
-import json
-from typing import Dict
+from typing import AsyncIterator, Dict, Iterator, Optional
 
 import src.app.acquire as acquire
+import src.app.codec as codec
 
 
 class Obtain:
@@ -11,16 +11,16 @@ class Obtain:
     # 获取工作室简介(简易,需登录工作室成员账号)
     def get_shops_simple(self):
         response = self.acquirt.send_request(url="/web/work_shops/simple", method="get")
-        result = response.json()["work_shop"]
+        result = codec.decode(response.content)["work_shop"]
         return result
 
     # 获取工作室简介
     def get_shop_detials(self, id: str) -> Dict:
         response = self.acquire.send_request(url=f"/web/shops/{id}", method="get")
 
-        return response.json()
+        return codec.decode(response.content)
 
-    # 获取工作室列表的函数
+    # 获取工作室列表的函数, checkpoint为True时可从中断处继续
     def get_shops(
         self,
         level: int = 4,
@@ -28,6 +28,8 @@ class Obtain:
         works_limit: int = 4,
         offset: int = 0,
         sort: str = None,
+        deadline: Optional[float] = None,
+        checkpoint: bool = False,
     ):  # 不要问我limit默认值为啥是14，因为api默认获取14个
         # sort可以不填,参数为-latest_joined_at,-created_at这两个可以互换位置，但不能填一个
         params = {
@@ -42,20 +44,181 @@ class Obtain:
             params=params,
             total_key="total",
             data_key="items",
+            deadline=deadline,
+            checkpoint=checkpoint,
         )
         return shops
 
-    # 获取工作室成员
-    def get_shops_members(self, id: int, limit: int = 40, offset: int = 0):
+    # 逐个获取工作室, 调用方停止迭代后不再请求后面的分页
+    def iter_shops(
+        self,
+        level: int = 4,
+        limit: int = 14,
+        works_limit: int = 4,
+        offset: int = 0,
+        sort: str = None,
+        deadline: Optional[float] = None,
+    ) -> Iterator[Dict]:
+        params = {
+            "level": level,
+            "works_limit": works_limit,
+            "limit": limit,
+            "offset": offset,
+            "sort": sort,
+        }
+        return self.acquire.iter_all_data(
+            url="/web/work-shops/search",
+            params=params,
+            total_key="total",
+            data_key="items",
+            deadline=deadline,
+        )
+
+    # 获取工作室成员, checkpoint为True时可从中断处继续
+    def get_shops_members(
+        self,
+        id: int,
+        limit: int = 40,
+        offset: int = 0,
+        deadline: Optional[float] = None,
+        checkpoint: bool = False,
+    ):
         params = {"limit": limit, "offset": offset}
         menbers = self.acquire.fetch_all_data(
-            url=f"https://api.codemao.cn/web/shops/{id}/users",
+            url=f"/web/shops/{id}/users",
+            params=params,
+            total_key="total",
+            data_key="items",
+            deadline=deadline,
+            checkpoint=checkpoint,
+        )
+        return menbers
+
+    # 逐个获取工作室成员
+    def iter_shops_members(
+        self,
+        id: int,
+        limit: int = 40,
+        offset: int = 0,
+        deadline: Optional[float] = None,
+    ) -> Iterator[Dict]:
+        params = {"limit": limit, "offset": offset}
+        return self.acquire.iter_all_data(
+            url=f"/web/shops/{id}/users",
+            params=params,
+            total_key="total",
+            data_key="items",
+            deadline=deadline,
+        )
+
+
+class AsyncObtain:
+    def __init__(self) -> None:
+        self.acquire = acquire.AsyncCodeMaoClient()
+
+    # 获取工作室简介(简易,需登录工作室成员账号)
+    async def get_shops_simple(self):
+        response = await self.acquire.send_request(
+            url="/web/work_shops/simple", method="get"
+        )
+        result = codec.decode(response.content)["work_shop"]
+        return result
+
+    # 获取工作室简介
+    async def get_shop_detials(self, id: str) -> Dict:
+        response = await self.acquire.send_request(url=f"/web/shops/{id}", method="get")
+        return codec.decode(response.content)
+
+    # 获取工作室列表的函数, checkpoint为True时可从中断处继续
+    async def get_shops(
+        self,
+        level: int = 4,
+        limit: int = 14,
+        works_limit: int = 4,
+        offset: int = 0,
+        sort: str = None,
+        deadline: Optional[float] = None,
+        checkpoint: bool = False,
+    ):
+        params = {
+            "level": level,
+            "works_limit": works_limit,
+            "limit": limit,
+            "offset": offset,
+            "sort": sort,
+        }
+        shops = await self.acquire.fetch_all_data(
+            url="/web/work-shops/search",
             params=params,
             total_key="total",
             data_key="items",
+            deadline=deadline,
+            checkpoint=checkpoint,
+        )
+        return shops
+
+    # 逐个获取工作室, 调用方停止迭代后不再请求后面的分页
+    def iter_shops(
+        self,
+        level: int = 4,
+        limit: int = 14,
+        works_limit: int = 4,
+        offset: int = 0,
+        sort: str = None,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[Dict]:
+        params = {
+            "level": level,
+            "works_limit": works_limit,
+            "limit": limit,
+            "offset": offset,
+            "sort": sort,
+        }
+        return self.acquire.iter_all_data(
+            url="/web/work-shops/search",
+            params=params,
+            total_key="total",
+            data_key="items",
+            deadline=deadline,
+        )
+
+    # 获取工作室成员, checkpoint为True时可从中断处继续
+    async def get_shops_members(
+        self,
+        id: int,
+        limit: int = 40,
+        offset: int = 0,
+        deadline: Optional[float] = None,
+        checkpoint: bool = False,
+    ):
+        params = {"limit": limit, "offset": offset}
+        menbers = await self.acquire.fetch_all_data(
+            url=f"/web/shops/{id}/users",
+            params=params,
+            total_key="total",
+            data_key="items",
+            deadline=deadline,
+            checkpoint=checkpoint,
         )
         return menbers
 
+    # 逐个获取工作室成员
+    def iter_shops_members(
+        self,
+        id: int,
+        limit: int = 40,
+        offset: int = 0,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[Dict]:
+        params = {"limit": limit, "offset": offset}
+        return self.acquire.iter_all_data(
+            url=f"/web/shops/{id}/users",
+            params=params,
+            total_key="total",
+            data_key="items",
+            deadline=deadline,
+        )
+
 
 class Motion:
 
@@ -69,7 +232,7 @@ class Motion:
         response = self.acquire.send_request(
             url="/web/work_shops/update",
             method="post",
-            data=json.dumps(
+            data=codec.encode(
                 {
                     "description": description,
                     "id": id,
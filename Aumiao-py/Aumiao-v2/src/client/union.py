@@ -15,15 +15,14 @@ class WorkUnion:
         self.user_obtain = user.Obtain()
         self.work_obtain = work.Obtain()
         self.data = data.CodeMaoData()
+        self.tool = tool.CodeMaoProcess()
 
     # 清除作品广告的函数
     def clear_ad(self, keys) -> bool:
         works_list = self.user_obtain.get_user_works(self.data.ACCOUNT_DATA["id"])
         for item0 in works_list:
 
-            comments = self.work_obtain.get_comments_detail(
-                work_id=item0["id"], method="comments"
-            )
+            comments = self.get_comments_detail(work_id=item0["id"], method="comments")
             work_id = item0["id"]
             for item1 in comments:
                 comment_id = item1["id"]
@@ -63,6 +62,13 @@ class WorkUnion:
             raise ValueError("不支持的请求方法")
         return result
 
+    # 判断某人是否在作品评论区评论过, 找到后不再请求后面的分页
+    def has_commented(self, work_id: int, user_id: str) -> bool:
+        return any(
+            str(item["user"]["id"]) == str(user_id)
+            for item in self.work_obtain.iter_work_comments(work_id=work_id)
+        )
+
 
 class CommunityUnion:
 
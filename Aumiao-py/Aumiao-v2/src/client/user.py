@@ -1,20 +1,24 @@
-import json
-from typing import Dict, List
+from typing import AsyncIterator, Dict, Iterator, List, Optional
 
 import src.app.acquire as Acquire
+import src.app.codec as Codec
+import src.app.identity as Identity
 
 
 class Obtain:
     def __init__(self) -> None:
         self.acquire = Acquire.CodeMaoClient()
+        self.identity = Identity.CodeMaoIdentity()
 
-    # 获取某人账号信息
+    # 获取某人账号信息, 同一次运行中只请求一次
     def get_user_data(self, user_id: str) -> Dict:
-        response = self.acquire.send_request(
-            method="get", url=f"/api/user/info/detail/{user_id}"
-        )
+        def fetch() -> Dict:
+            response = self.acquire.send_request(
+                method="get", url=f"/api/user/info/detail/{user_id}"
+            )
+            return Codec.decode(response.content)["data"]["userInfo"]
 
-        return response.json()["data"]["userInfo"]
+        return self.identity.load("user", user_id, "detail", fetch)
 
     # 获取账户信息(详细)
     def get_data_details(self) -> Dict:
@@ -22,7 +26,7 @@ class Obtain:
             method="get",
             url="/web/users/details",
         )
-        return response.json()
+        return Codec.decode(response.content)
 
     # 获取账户信息(简略)
     def get_data_info(self) -> Dict:
@@ -31,21 +35,24 @@ class Obtain:
             url="/web/users/info",
         )
 
-        return response.json()
+        return Codec.decode(response.content)
 
-    # 获取用户荣誉
+    # 获取用户荣誉, 同一次运行中只请求一次
     def get_user_honor(self, user_id: str) -> Dict:
-        params = {"user_id": user_id}
-        response = self.acquire.send_request(
-            url="/creation-tools/v1/user/center/honor",
-            method="get",
-            params=params,
-        )
+        def fetch() -> Dict:
+            response = self.acquire.send_request(
+                url="/creation-tools/v1/user/center/honor",
+                method="get",
+                params={"user_id": user_id},
+            )
+            return Codec.decode(response.content)
 
-        return response.json()
+        return self.identity.load("user", user_id, "honor", fetch, id_key="user_id")
 
     # 获取个人作品列表的函数
-    def get_user_works(self, user_id: str) -> List[Dict[str, str]]:
+    def get_user_works(
+        self, user_id: str, deadline: Optional[float] = None
+    ) -> List[Dict[str, str]]:
         params = {
             "type": "newest",
             "user_id": user_id,
@@ -57,26 +64,75 @@ class Obtain:
             params=params,
             total_key="total",
             data_key="items",
+            deadline=deadline,
         )
-        return works
+        return self.identity.merge_all("work", works)
+
+    # 逐个获取个人作品, 调用方停止迭代后不再请求后面的分页
+    def iter_user_works(
+        self, user_id: str, deadline: Optional[float] = None
+    ) -> Iterator[Dict[str, str]]:
+        params = {
+            "type": "newest",
+            "user_id": user_id,
+            "offset": 0,
+            "limit": 5,
+        }
+        for work in self.acquire.iter_all_data(
+            url="/creation-tools/v2/user/center/work-list",
+            params=params,
+            total_key="total",
+            data_key="items",
+            deadline=deadline,
+        ):
+            yield self.identity.merge("work", work)
 
-    # 获取粉丝列表
-    def get_user_fans(self, user_id: str) -> List[Dict[str, str]]:
+    # 获取粉丝列表, checkpoint为True时可从中断处继续
+    def get_user_fans(
+        self,
+        user_id: str,
+        deadline: Optional[float] = None,
+        checkpoint: bool = False,
+    ) -> List[Dict[str, str]]:
         params = {
             "user_id": user_id,
             "offset": 0,
             "limit": 15,
         }
-        fans = self.fetch_all_data(
+        fans = self.acquire.fetch_all_data(
             url="/creation-tools/v1/user/fans",
             params=params,
             total_key="total",
             data_key="items",
+            deadline=deadline,
+            checkpoint=checkpoint,
         )
         return fans
 
-    # 获取关注列表
-    def get_user_follows(self, user_id: str) -> List[Dict[str, str]]:
+    # 逐个获取粉丝
+    def iter_user_fans(
+        self, user_id: str, deadline: Optional[float] = None
+    ) -> Iterator[Dict[str, str]]:
+        params = {
+            "user_id": user_id,
+            "offset": 0,
+            "limit": 15,
+        }
+        return self.acquire.iter_all_data(
+            url="/creation-tools/v1/user/fans",
+            params=params,
+            total_key="total",
+            data_key="items",
+            deadline=deadline,
+        )
+
+    # 获取关注列表, checkpoint为True时可从中断处继续
+    def get_user_follows(
+        self,
+        user_id: str,
+        deadline: Optional[float] = None,
+        checkpoint: bool = False,
+    ) -> List[Dict[str, str]]:
         params = {
             "user_id": user_id,
             "offset": 0,
@@ -87,9 +143,28 @@ class Obtain:
             params=params,
             total_key="total",
             data_key="items",
+            deadline=deadline,
+            checkpoint=checkpoint,
         )
         return follows
 
+    # 逐个获取关注
+    def iter_user_follows(
+        self, user_id: str, deadline: Optional[float] = None
+    ) -> Iterator[Dict[str, str]]:
+        params = {
+            "user_id": user_id,
+            "offset": 0,
+            "limit": 15,
+        }
+        return self.acquire.iter_all_data(
+            url="/creation-tools/v1/user/followers",
+            params=params,
+            total_key="total",
+            data_key="items",
+            deadline=deadline,
+        )
+
 
 class Motion:
 
@@ -101,7 +176,7 @@ class Motion:
         response = self.acquire.send_request(
             url="/tiger/v3/web/accounts/username",
             method="patch",
-            data=json.dumps({"username": username}),
+            data=Codec.encode({"username": username}),
         )
         return response.status_code
 
@@ -111,4 +186,166 @@ class Motion:
         response = self.acquire.send_request(
             url="/web/users/phone_number/is_consistent", method="get", params=params
         )
-        return response.json()
+        return Codec.decode(response.content)
+
+
+class AsyncObtain:
+    def __init__(self) -> None:
+        self.acquire = Acquire.AsyncCodeMaoClient()
+        self.identity = Identity.CodeMaoIdentity()
+
+    # 获取某人账号信息, 同一次运行中只请求一次
+    async def get_user_data(self, user_id: str) -> Dict:
+        async def fetch() -> Dict:
+            response = await self.acquire.send_request(
+                method="get", url=f"/api/user/info/detail/{user_id}"
+            )
+            return Codec.decode(response.content)["data"]["userInfo"]
+
+        return await self.identity.load_async("user", user_id, "detail", fetch)
+
+    # 获取账户信息(详细)
+    async def get_data_details(self) -> Dict:
+        response = await self.acquire.send_request(
+            method="get",
+            url="/web/users/details",
+        )
+        return Codec.decode(response.content)
+
+    # 获取账户信息(简略)
+    async def get_data_info(self) -> Dict:
+        response = await self.acquire.send_request(
+            method="get",
+            url="/web/users/info",
+        )
+        return Codec.decode(response.content)
+
+    # 获取用户荣誉, 同一次运行中只请求一次
+    async def get_user_honor(self, user_id: str) -> Dict:
+        async def fetch() -> Dict:
+            response = await self.acquire.send_request(
+                url="/creation-tools/v1/user/center/honor",
+                method="get",
+                params={"user_id": user_id},
+            )
+            return Codec.decode(response.content)
+
+        return await self.identity.load_async(
+            "user", user_id, "honor", fetch, id_key="user_id"
+        )
+
+    # 获取个人作品列表的函数
+    async def get_user_works(
+        self, user_id: str, deadline: Optional[float] = None
+    ) -> List[Dict[str, str]]:
+        params = {
+            "type": "newest",
+            "user_id": user_id,
+            "offset": 0,
+            "limit": 5,
+        }
+        works = await self.acquire.fetch_all_data(
+            url="/creation-tools/v2/user/center/work-list",
+            params=params,
+            total_key="total",
+            data_key="items",
+            deadline=deadline,
+        )
+        return self.identity.merge_all("work", works)
+
+    # 逐个获取个人作品, 调用方停止迭代后不再请求后面的分页
+    async def iter_user_works(
+        self, user_id: str, deadline: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, str]]:
+        params = {
+            "type": "newest",
+            "user_id": user_id,
+            "offset": 0,
+            "limit": 5,
+        }
+        async for work in self.acquire.iter_all_data(
+            url="/creation-tools/v2/user/center/work-list",
+            params=params,
+            total_key="total",
+            data_key="items",
+            deadline=deadline,
+        ):
+            yield self.identity.merge("work", work)
+
+    # 获取粉丝列表, checkpoint为True时可从中断处继续
+    async def get_user_fans(
+        self,
+        user_id: str,
+        deadline: Optional[float] = None,
+        checkpoint: bool = False,
+    ) -> List[Dict[str, str]]:
+        params = {
+            "user_id": user_id,
+            "offset": 0,
+            "limit": 15,
+        }
+        fans = await self.acquire.fetch_all_data(
+            url="/creation-tools/v1/user/fans",
+            params=params,
+            total_key="total",
+            data_key="items",
+            deadline=deadline,
+            checkpoint=checkpoint,
+        )
+        return fans
+
+    # 逐个获取粉丝
+    def iter_user_fans(
+        self, user_id: str, deadline: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, str]]:
+        params = {
+            "user_id": user_id,
+            "offset": 0,
+            "limit": 15,
+        }
+        return self.acquire.iter_all_data(
+            url="/creation-tools/v1/user/fans",
+            params=params,
+            total_key="total",
+            data_key="items",
+            deadline=deadline,
+        )
+
+    # 获取关注列表, checkpoint为True时可从中断处继续
+    async def get_user_follows(
+        self,
+        user_id: str,
+        deadline: Optional[float] = None,
+        checkpoint: bool = False,
+    ) -> List[Dict[str, str]]:
+        params = {
+            "user_id": user_id,
+            "offset": 0,
+            "limit": 15,
+        }
+        follows = await self.acquire.fetch_all_data(
+            url="/creation-tools/v1/user/followers",
+            params=params,
+            total_key="total",
+            data_key="items",
+            deadline=deadline,
+            checkpoint=checkpoint,
+        )
+        return follows
+
+    # 逐个获取关注
+    def iter_user_follows(
+        self, user_id: str, deadline: Optional[float] = None
+    ) -> AsyncIterator[Dict[str, str]]:
+        params = {
+            "user_id": user_id,
+            "offset": 0,
+            "limit": 15,
+        }
+        return self.acquire.iter_all_data(
+            url="/creation-tools/v1/user/followers",
+            params=params,
+            total_key="total",
+            data_key="items",
+            deadline=deadline,
+        )
@@ -1,6 +1,8 @@
-import json
+from typing import AsyncIterator, Dict, Iterator, Optional
 
 import src.app.acquire as acquire
+import src.app.codec as codec
+import src.app.identity as identity
 import src.app.tool as tool
 
 
@@ -13,7 +15,7 @@ class Motion:
         response = self.acquire.send_request(
             url=f"/nemo/v2/user/{user_id}/follow",
             method=method,
-            data=json.dumps({}),
+            data=codec.encode({}),
         )
 
         return response.status_code == 204
@@ -23,7 +25,7 @@ class Motion:
         response = self.acquire.send_request(
             url=f"/nemo/v2/works/{work_id}/collection",
             method=method,
-            data=json.dumps({}),
+            data=codec.encode({}),
         )
         return response.status_code == 200
 
@@ -33,7 +35,7 @@ class Motion:
         response = self.acquire.send_request(
             url=f"/nemo/v2/works/{work_id}/like",
             method=method,
-            data=json.dumps({}),
+            data=codec.encode({}),
         )
         return response.status_code == 200
 
@@ -42,7 +44,7 @@ class Motion:
         response = self.acquire.send_request(
             url=f"/creation-tools/v1/works/{work_id}/comment",
             method="post",
-            data=json.dumps(
+            data=codec.encode(
                 {
                     "content": comment,
                     "emoji_content": emoji,
@@ -57,37 +59,125 @@ class Obtain:
     def __init__(self) -> None:
         self.acquire = acquire.CodeMaoClient()
         self.tool = tool.CodeMaoProcess()
+        self.identity = identity.CodeMaoIdentity()
 
-    # 获取评论区评论
-    def get_work_comments(self, work_id: int):
+    # 获取评论区评论, 该接口的page_total不可靠, 翻到不满一页为止
+    def get_work_comments(self, work_id: int, deadline: Optional[float] = None):
         params = {"limit": 15, "offset": 0}
         comments = self.acquire.fetch_all_data(
             url=f"/creation-tools/v1/works/{work_id}/comments",
             params=params,
-            total_key="page_total",
+            total_key=None,
             data_key="items",
+            deadline=deadline,
         )
+        # 评论者与其他模块取得的同一用户共用一份对象
+        for comment in comments:
+            if isinstance(comment.get("user"), dict):
+                comment["user"] = self.identity.merge("user", comment["user"])
         return comments
 
-    # 获取作品信息
+    # 逐条获取评论区评论, 调用方停止迭代(如已找到所需评论)后不再请求后面的分页
+    def iter_work_comments(
+        self, work_id: int, deadline: Optional[float] = None
+    ) -> Iterator[Dict]:
+        for comment in self.acquire.iter_all_data(
+            url=f"/creation-tools/v1/works/{work_id}/comments",
+            params={"limit": 15, "offset": 0},
+            total_key=None,
+            data_key="items",
+            deadline=deadline,
+        ):
+            if isinstance(comment.get("user"), dict):
+                comment["user"] = self.identity.merge("user", comment["user"])
+            yield comment
+
+    # 获取作品信息, 同一次运行中只请求一次
     def get_work_detial(self, work_id: int):
-        response = self.acquire.send_request(
-            url=f"https://api.codemao.cn/creation-tools/v1/works/{work_id}",
-            method="get",
-        )
-        return response.json()
+        def fetch():
+            response = self.acquire.send_request(
+                url=f"/creation-tools/v1/works/{work_id}",
+                method="get",
+            )
+            return codec.decode(response.content)
+
+        return self.identity.load("work", work_id, "detail", fetch)
 
     # 获取其他作品推荐
     def get_other_recommended(self, work_id: int):
         response = self.acquire.send_request(
-            url=f"https://api.codemao.cn/nemo/v2/works/web/{work_id}/recommended",
+            url=f"/nemo/v2/works/web/{work_id}/recommended",
             method="get",
         )
-        return response.json()
+        return codec.decode(response.content)
 
     # 获取作品信息(info)
     def get_work_info(self, work_id: int):
         response = self.acquire.send_request(
-            url=f"https://api.codemao.cn/api/work/info/{work_id}", method="get"
+            url=f"/api/work/info/{work_id}", method="get"
+        )
+        return codec.decode(response.content)
+
+
+class AsyncObtain:
+
+    def __init__(self) -> None:
+        self.acquire = acquire.AsyncCodeMaoClient()
+        self.identity = identity.CodeMaoIdentity()
+
+    # 获取评论区评论, 该接口的page_total不可靠, 翻到不满一页为止
+    async def get_work_comments(self, work_id: int, deadline: Optional[float] = None):
+        params = {"limit": 15, "offset": 0}
+        comments = await self.acquire.fetch_all_data(
+            url=f"/creation-tools/v1/works/{work_id}/comments",
+            params=params,
+            total_key=None,
+            data_key="items",
+            deadline=deadline,
+        )
+        # 评论者与其他模块取得的同一用户共用一份对象
+        for comment in comments:
+            if isinstance(comment.get("user"), dict):
+                comment["user"] = self.identity.merge("user", comment["user"])
+        return comments
+
+    # 逐条获取评论区评论, 调用方停止迭代(如已找到所需评论)后不再请求后面的分页
+    async def iter_work_comments(
+        self, work_id: int, deadline: Optional[float] = None
+    ) -> AsyncIterator[Dict]:
+        async for comment in self.acquire.iter_all_data(
+            url=f"/creation-tools/v1/works/{work_id}/comments",
+            params={"limit": 15, "offset": 0},
+            total_key=None,
+            data_key="items",
+            deadline=deadline,
+        ):
+            if isinstance(comment.get("user"), dict):
+                comment["user"] = self.identity.merge("user", comment["user"])
+            yield comment
+
+    # 获取作品信息, 同一次运行中只请求一次
+    async def get_work_detial(self, work_id: int):
+        async def fetch():
+            response = await self.acquire.send_request(
+                url=f"/creation-tools/v1/works/{work_id}",
+                method="get",
+            )
+            return codec.decode(response.content)
+
+        return await self.identity.load_async("work", work_id, "detail", fetch)
+
+    # 获取其他作品推荐
+    async def get_other_recommended(self, work_id: int):
+        response = await self.acquire.send_request(
+            url=f"/nemo/v2/works/web/{work_id}/recommended",
+            method="get",
+        )
+        return codec.decode(response.content)
+
+    # 获取作品信息(info)
+    async def get_work_info(self, work_id: int):
+        response = await self.acquire.send_request(
+            url=f"/api/work/info/{work_id}", method="get"
         )
-        return response.json()
+        return codec.decode(response.content)
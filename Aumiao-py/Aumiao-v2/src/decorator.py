@@ -1,6 +1,14 @@
+import random
+import threading
+import time
+from collections import Counter
 from functools import wraps
-from time import sleep
-from typing import Any, Callable
+from typing import Any, Callable, Dict, Optional
+
+# 按HTTP语义重复执行不会产生额外副作用的请求方法
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"})
+# 值得重试的响应状态码
+RETRY_STATUS = frozenset({429, 500, 502, 503, 504})
 
 
 def Singleton(cls):
@@ -14,26 +22,82 @@ def Singleton(cls):
     return _singleton
 
 
-def retry(retries: int = 3, delay: float = 1) -> Callable:
-    if retries < 1 or delay <= 0:
-        raise ValueError("Are you high, mate?")
+# 重试策略: 指数退避加随机抖动, 总耗时不超过deadline秒
+# 服务器给出Retry-After时以其为准, 非幂等请求需显式声明才会重试
+class RetryPolicy:
+    def __init__(
+        self,
+        retries: int = 3,
+        base: float = 0.5,
+        cap: float = 30,
+        deadline: float = 60,
+        jitter: bool = True,
+    ) -> None:
+        if retries < 1 or base <= 0:
+            raise ValueError("Are you high, mate?")
+        self.retries = retries
+        self.base = base
+        self.cap = cap
+        self.deadline = deadline
+        self.jitter = jitter
+        self.counter = Counter()
+        self.lock = threading.Lock()
+
+    # idempotent为None时按请求方法判断
+    def should_retry(self, method: str, idempotent: Optional[bool] = None) -> bool:
+        if idempotent is not None:
+            return idempotent
+        return method.upper() in IDEMPOTENT_METHODS
+
+    # 第attempt次失败后的等待秒数, 超出重试次数或总时限时返回None
+    def backoff(
+        self, attempt: int, started: float, retry_after: Optional[float] = None
+    ) -> Optional[float]:
+        if attempt >= self.retries:
+            return None
+        if retry_after is not None:
+            delay = retry_after
+        else:
+            delay = min(self.cap, self.base * 2**attempt)
+            if self.jitter:
+                delay = random.uniform(0, delay)
+        if time.monotonic() - started + delay > self.deadline:
+            return None
+        return delay
+
+    def record(self, key: str) -> None:
+        with self.lock:
+            self.counter[key] += 1
+
+    # 各接口的重试次数
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return dict(self.counter)
+
+
+def retry(
+    retries: int = 3, delay: float = 1, policy: Optional[RetryPolicy] = None
+) -> Callable:
+    policy = policy or RetryPolicy(retries=retries, base=delay)
 
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            for i in range(1, retries + 1):
-
+            started = time.monotonic()
+            attempt = 0
+            while True:
                 try:
                     return func(*args, **kwargs)
                 except Exception as e:
-
-                    if i == retries:
+                    wait = policy.backoff(attempt, started)
+                    if wait is None:
                         print(f"Error: {repr(e)}.")
-                        print(f'"{func.__name__}()" failed after {retries} retries.')
-                        break
-                    else:
-                        print(f"Error: {repr(e)} -> Retrying...")
-                        sleep(delay)
+                        print(f'"{func.__name__}()" failed after {attempt + 1} tries.')
+                        raise
+                    print(f"Error: {repr(e)} -> Retrying...")
+                    policy.record(func.__name__)
+                    time.sleep(wait)
+                    attempt += 1
 
         return wrapper
 
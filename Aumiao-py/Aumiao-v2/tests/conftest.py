@@ -0,0 +1,75 @@
+import os
+import sys
+from typing import Callable, Dict, List, Tuple
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+# 数据文件路径在导入时由工作目录决定, 测试统一在项目根目录下运行
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.chdir(ROOT)
+sys.path.insert(0, ROOT)
+
+import src  # noqa: E402
+from src.app import codec as Codec  # noqa: E402
+
+
+# 按handler返回的(状态码, 响应体)构造响应, 不发出真实请求
+class FakeAdapter(BaseAdapter):
+    def __init__(self, handler: Callable[[requests.PreparedRequest], Tuple]) -> None:
+        super().__init__()
+        self.handler = handler
+        self.requests: List[requests.PreparedRequest] = []
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        self.requests.append(request)
+        status, body = self.handler(request)
+        response = requests.Response()
+        response.status_code = status
+        response.reason = "OK" if status < 400 else "Error"
+        response.headers["Content-Type"] = "application/json"
+        response._content = Codec.encode(body)
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+# 解除限速、关闭缓存和每页数量试探, 重置熔断与统计, 测试结束后恢复配置
+@pytest.fixture
+def client(monkeypatch):
+    client = src.app_acquire
+    monkeypatch.setitem(client.cache.CACHE, "ttl", {})
+    for group in list(client.limiter.RATE_LIMIT):
+        monkeypatch.setitem(
+            client.limiter.RATE_LIMIT, group, {"rate": 1e6, "burst": 1e6}
+        )
+    monkeypatch.setattr(client.retry_policy, "base", 0.001)
+    monkeypatch.setitem(client.page_size.PAGE_SIZE, "enabled", False)
+    client.limiter.buckets.clear()
+    client.cache.clear()
+    client.breaker.circuits.clear()
+    client.metrics.reset()
+    yield client
+    client.session.mount(None)
+    client.limiter.buckets.clear()
+    client.breaker.circuits.clear()
+
+
+# 安装FakeAdapter, 返回安装的实例
+@pytest.fixture
+def serve(client):
+    def install(handler: Callable[[requests.PreparedRequest], Tuple]) -> FakeAdapter:
+        adapter = FakeAdapter(handler)
+        client.session.mount(adapter)
+        return adapter
+
+    return install
+
+
+def page(items: List[Dict], total: int) -> Dict:
+    return {"items": items, "total": total}
@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from src.app import acquire as Acquire
+from src.app import breaker as Breaker
+
+TEMPLATE = "/creation-tools/v1/works/{id}"
+
+
+@pytest.fixture
+def breaker(client, monkeypatch):
+    monkeypatch.setitem(client.breaker.BREAKER, "threshold", 2)
+    monkeypatch.setitem(client.breaker.BREAKER, "reset", 0)
+    monkeypatch.setitem(client.breaker.BREAKER, "probes", 1)
+    return client.breaker
+
+
+def open_circuit(breaker, reset: float = 0) -> None:
+    breaker.BREAKER["reset"] = reset
+    for _ in range(breaker.BREAKER["threshold"]):
+        breaker.failure(TEMPLATE)
+
+
+def test_opens_after_threshold(breaker):
+    breaker.failure(TEMPLATE)
+    assert breaker.state(TEMPLATE) == Breaker.CLOSED
+    open_circuit(breaker, reset=60)
+    assert breaker.state(TEMPLATE) == Breaker.OPEN
+    with pytest.raises(Breaker.CircuitOpenError):
+        breaker.allow(TEMPLATE)
+
+
+def test_half_open_allows_limited_probes(breaker):
+    open_circuit(breaker)
+    assert breaker.state(TEMPLATE) == Breaker.HALF_OPEN
+    breaker.allow(TEMPLATE)
+    with pytest.raises(Breaker.CircuitOpenError):
+        breaker.allow(TEMPLATE)
+    breaker.success(TEMPLATE)
+    assert breaker.state(TEMPLATE) == Breaker.CLOSED
+
+
+def test_half_open_failure_reopens(breaker):
+    open_circuit(breaker)
+    breaker.allow(TEMPLATE)
+    breaker.BREAKER["reset"] = 60
+    breaker.failure(TEMPLATE)
+    assert breaker.state(TEMPLATE) == Breaker.OPEN
+
+
+def test_release_returns_probe(breaker):
+    open_circuit(breaker)
+    breaker.allow(TEMPLATE)
+    breaker.release(TEMPLATE)
+    breaker.allow(TEMPLATE)
+    assert breaker.state(TEMPLATE) == Breaker.HALF_OPEN
+
+
+# 试探请求到达截止时间后不应一直占用试探名额
+def test_deadline_during_probe_does_not_stick(breaker, client, serve):
+    open_circuit(breaker)
+    adapter = serve(lambda request: (200, {"id": 1}))
+    with pytest.raises(Acquire.DeadlineExceeded):
+        client.send_request(
+            url="/creation-tools/v1/works/1",
+            method="get",
+            deadline=time.monotonic() - 1,
+        )
+    assert not adapter.requests
+    response = client.send_request(url="/creation-tools/v1/works/1", method="get")
+    assert response.status_code == 200
+    assert breaker.state(TEMPLATE) == Breaker.CLOSED
+
+
+# 请求过程中抛出的其他异常同样归还试探名额
+def test_error_during_probe_releases(breaker, client, serve):
+    open_circuit(breaker)
+
+    def handler(request):
+        raise KeyboardInterrupt
+
+    serve(handler)
+    with pytest.raises(KeyboardInterrupt):
+        client.send_request(url="/creation-tools/v1/works/1", method="get")
+    serve(lambda request: (200, {"id": 1}))
+    assert client.send_request(url="/creation-tools/v1/works/1", method="get").ok
@@ -0,0 +1,113 @@
+import os
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from requests.exceptions import HTTPError
+
+from src.app import checkpoint as Checkpoint
+from src.app import codec as Codec
+from src.app import data as Data
+
+URL = "/creation-tools/v1/works/1/comments"
+PARAMS = {"limit": 10, "offset": 0}
+ITEMS = [{"id": index} for index in range(45)]
+
+
+@pytest.fixture(autouse=True)
+def directory(monkeypatch, tmp_path):
+    monkeypatch.setattr(Data, "CHECKPOINT_DIR_PATH", str(tmp_path))
+    return tmp_path
+
+
+# method为offset或page, failing为出错的偏移量或页码, delay为每个请求的耗时
+def comments(method: str = "offset", failing=None, delay: float = 0):
+    def handler(request):
+        time.sleep(delay)
+        query = parse_qs(urlsplit(request.url).query)
+        limit, value = int(query["limit"][0]), int(query[method][0])
+        if value == failing:
+            return 500, {"error_code": "Internal"}
+        offset = value if method == "offset" else (value - 1) * limit
+        return 200, {"items": ITEMS[offset : offset + limit], "total": len(ITEMS)}
+
+    handler.method = method
+    return handler
+
+
+def sent(adapter, key: str):
+    return [int(parse_qs(urlsplit(r.url).query)[key][0]) for r in adapter.requests]
+
+
+def test_torn_line_is_truncated(directory):
+    saved = Checkpoint.CodeMaoCheckpoint(URL, PARAMS)
+    saved.append(10, 10, ITEMS[:10])
+    saved.append(20, 10, ITEMS[10:20])
+    size = os.path.getsize(saved.path)
+    with open(saved.path, "ab") as file:
+        file.write(Codec.encode({"next": 30, "limit": 10, "items": ITEMS[20:30]})[:-5])
+    assert saved.load() == (20, 10, ITEMS[:20])
+    assert os.path.getsize(saved.path) == size
+    saved.append(30, 10, ITEMS[20:30])
+    assert saved.load() == (30, 10, ITEMS[:30])
+
+
+def test_key_mismatch_discards_checkpoint(directory):
+    saved = Checkpoint.CodeMaoCheckpoint(URL, PARAMS)
+    saved.append(10, 10, ITEMS[:10])
+    other = Checkpoint.CodeMaoCheckpoint(URL, {**PARAMS, "limit": 20})
+    os.replace(saved.path, other.path)
+    assert other.load() == (None, None, [])
+    assert not os.path.exists(other.path)
+
+
+@pytest.mark.parametrize(
+    "method, args, params, failing, resumed",
+    [
+        ("offset", {"amount": "limit", "remove": "offset"}, PARAMS, 30, [30, 40]),
+        (
+            "page",
+            {"amount": "limit", "remove": "page"},
+            {"limit": 10, "page": 1},
+            4,
+            [4, 5],
+        ),
+    ],
+)
+def test_resume_after_error(client, serve, method, args, params, failing, resumed):
+    serve(comments(method, failing))
+    with pytest.raises(HTTPError):
+        client.fetch_all_data(
+            URL, params, data_key="items", method=method, args=args, checkpoint=True
+        )
+    saved = Checkpoint.CodeMaoCheckpoint(URL, params)
+    assert saved.load()[2] == ITEMS[:30]
+    adapter = serve(comments(method))
+    result = client.fetch_all_data(
+        URL, params, data_key="items", method=method, args=args, checkpoint=True
+    )
+    assert result == ITEMS
+    assert not result.partial
+    # 从断点逐页继续, 不在最后一页之后多发请求
+    assert sent(adapter, method) == resumed
+    assert not os.path.exists(saved.path)
+
+
+def test_partial_run_keeps_checkpoint(client, serve):
+    serve(comments(delay=0.05))
+    result = client.fetch_all_data(
+        URL,
+        PARAMS,
+        total_key=None,
+        data_key="items",
+        deadline=time.monotonic() + 0.08,
+        checkpoint=True,
+    )
+    assert result.partial
+    saved = Checkpoint.CodeMaoCheckpoint(URL, PARAMS)
+    assert saved.load()[2] == result
+    serve(comments())
+    assert (
+        client.fetch_all_data(URL, PARAMS, data_key="items", checkpoint=True) == ITEMS
+    )
+    assert not os.path.exists(saved.path)
@@ -0,0 +1,49 @@
+import json
+
+from src.app import codec as Codec
+from src.app import data as Data
+
+
+# 写回文件的格式不随是否安装orjson变化, 与原有配置文件一致
+def test_pretty_matches_config_file():
+    with open(Data.DATA_FILE_PATH, "rb") as file:
+        text = file.read()
+    assert Codec.encode(Codec.decode(text), pretty=True) == text
+    obj = {"名称": [1, 2.5, None], "nested": {"a": True}}
+    assert Codec.encode(obj, pretty=True) == json.dumps(
+        obj, ensure_ascii=False, indent=4
+    ).encode("utf-8")
+
+
+def test_compact_round_trip():
+    obj = {"items": [{"id": 1, "content": "评论"}], "total": 1}
+    assert Codec.decode(Codec.encode(obj)) == obj
+
+
+DOCUMENT = (
+    '{"total": 4, "data": {"items": [1.5, -20e-1, "a,]b", {"id": 3, "s": "\\u8bc4"},'
+    ' true, null, 12345678901234567890, [1, [2]]]}, "after": 1}'
+).encode("utf-8")
+
+
+def split(document: bytes, size: int):
+    return [document[i : i + size] for i in range(0, len(document), size)]
+
+
+def test_iter_items_any_chunk_size():
+    expected = json.loads(DOCUMENT)["data"]["items"]
+    for size in range(1, len(DOCUMENT) + 1):
+        assert list(Codec.iter_items(split(DOCUMENT, size), "data.items")) == expected
+
+
+# 数字在"1."之后被截断时不能先产出1
+def test_iter_items_number_split_at_every_position():
+    document = b'{"items": [1.5, 2, 300]}'
+    for cut in range(1, len(document)):
+        chunks = [document[:cut], document[cut:]]
+        assert list(Codec.iter_items(chunks, "items")) == [1.5, 2, 300]
+
+
+def test_iter_items_missing_path():
+    assert list(Codec.iter_items([b'{"items": {"x": [1]}}'], "items.y")) == []
+    assert list(Codec.iter_items([b'{"other": [1]}'], "items")) == []
@@ -0,0 +1,87 @@
+import asyncio
+import random
+import threading
+import time
+
+from src.app import concurrency as Concurrency
+
+CONFIG = {
+    "enabled": True,
+    "initial": 4,
+    "min": 1,
+    "max": 32,
+    "increase": 1,
+    "decrease": 0.5,
+}
+
+
+def fill(window: Concurrency.Window) -> None:
+    for _ in range(window.limit()):
+        window.enter()
+
+
+# 延迟抖动不算拥塞, 窗口不会因此缩小
+def test_latency_jitter_does_not_shrink_window():
+    window = Concurrency.Window(CONFIG)
+    rng = random.Random(1)
+    for _ in range(200):
+        fill(window)
+        for _ in range(window.limit()):
+            window.leave(0.05 + rng.uniform(-1, 1) * 0.04, 200)
+    assert window.stats()["decreases"] == 0
+    assert window.limit() > CONFIG["initial"]
+
+
+def test_errors_shrink_window_once_per_round_trip():
+    window = Concurrency.Window({**CONFIG, "initial": 8})
+    fill(window)
+    window.leave(0.05, 200)
+    window.leave(0.05, 503)
+    window.leave(0.05, failed=True)
+    assert window.limit() == 4
+    assert window.stats()["decreases"] == 1
+
+
+def test_enter_gives_up_at_deadline():
+    window = Concurrency.Window({**CONFIG, "initial": 1})
+    window.enter()
+    started = time.monotonic()
+    assert window.enter(deadline=started + 0.05) is None
+    assert 0.04 <= time.monotonic() - started < 1
+    assert window.stats()["in_flight"] == 1
+
+
+# 窗口空出位置时先交给等待中的交互请求
+def test_interactive_waiters_go_first():
+    window = Concurrency.Window({**CONFIG, "initial": 1})
+    window.enter()
+    order = []
+
+    def wait(priority: str) -> None:
+        window.enter(priority=priority)
+        order.append(priority)
+        window.leave()
+
+    background = threading.Thread(target=wait, args=("background",))
+    background.start()
+    while not window.queued["background"]:
+        time.sleep(0.001)
+    interactive = threading.Thread(target=wait, args=("interactive",))
+    interactive.start()
+    while not window.queued["interactive"]:
+        time.sleep(0.001)
+    window.leave()
+    background.join(1)
+    interactive.join(1)
+    assert order == ["interactive", "background"]
+
+
+def test_enter_async_gives_up_at_deadline():
+    async def main():
+        window = Concurrency.Window({**CONFIG, "initial": 1})
+        await window.enter_async()
+        assert await window.enter_async(time.monotonic() + 0.05) is None
+        window.leave()
+        assert await window.enter_async(time.monotonic() + 0.05) is not None
+
+    asyncio.run(main())
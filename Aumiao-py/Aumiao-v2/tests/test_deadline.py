@@ -0,0 +1,66 @@
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from src.app import acquire as Acquire
+
+URL = "/creation-tools/v1/works/1/comments"
+ITEMS = [{"id": index} for index in range(50)]
+
+
+def comments(delay: float):
+    def handler(request):
+        time.sleep(delay)
+        query = parse_qs(urlsplit(request.url).query)
+        limit, offset = int(query["limit"][0]), int(query["offset"][0])
+        return 200, {"items": ITEMS[offset : offset + limit], "total": len(ITEMS)}
+
+    return handler
+
+
+def test_timeout_is_clamped_to_deadline(client):
+    assert client.get_timeout((3, 15), None) == (3, 15)
+    connect, read = client.get_timeout((3, 15), time.monotonic() + 1)
+    assert connect <= 1 and read <= 1
+    with pytest.raises(Acquire.DeadlineExceeded):
+        client.get_timeout((3, 15), time.monotonic() - 1)
+
+
+def test_complete_result_is_not_partial(client, serve):
+    serve(comments(0))
+    result = client.fetch_all_data(URL, {"limit": 10, "offset": 0}, data_key="items")
+    assert result == ITEMS
+    assert not result.partial
+
+
+# 到达截止时间时返回截止前按顺序连续获取到的分页, 并标记partial
+@pytest.mark.parametrize("total_key", ["total", None])
+def test_deadline_returns_partial_prefix(client, serve, total_key):
+    serve(comments(0.05))
+    result = client.fetch_all_data(
+        URL,
+        {"limit": 10, "offset": 0},
+        total_key=total_key,
+        data_key="items",
+        deadline=time.monotonic() + 0.08,
+        concurrency=2,
+    )
+    assert result.partial
+    assert 0 < len(result) < len(ITEMS)
+    assert len(result) % 10 == 0
+    assert result == ITEMS[: len(result)]
+
+
+def test_iter_all_data_raises_at_deadline(client, serve):
+    serve(comments(0.05))
+    received = []
+    with pytest.raises(Acquire.DeadlineExceeded):
+        for item in client.iter_all_data(
+            URL,
+            {"limit": 10, "offset": 0},
+            data_key="items",
+            deadline=time.monotonic() + 0.12,
+        ):
+            received.append(item)
+    assert received == ITEMS[: len(received)]
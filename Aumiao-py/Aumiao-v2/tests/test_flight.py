@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+from requests.exceptions import ReadTimeout
+
+from src.app import acquire as Acquire
+
+URL = "/creation-tools/v1/works/1"
+
+
+def test_concurrent_gets_are_merged(client, serve):
+    release = threading.Event()
+
+    def handler(request):
+        release.wait(1)
+        return 200, {"id": 1}
+
+    adapter = serve(handler)
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(client.send_request(URL, "get").status_code)
+        )
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(1)
+    assert results == [200, 200, 200]
+    assert len(adapter.requests) == 1
+
+
+# 发起者到达截止时间时, 没有截止时间的相同请求不应收到它的DeadlineExceeded
+def test_deadline_is_not_shared(client, serve):
+    release = threading.Event()
+
+    def handler(request):
+        if len(adapter.requests) == 1:
+            release.wait(1)
+            raise ReadTimeout("模拟读取超时")
+        return 200, {"id": 1}
+
+    adapter = serve(handler)
+    errors, results = [], []
+
+    def leader():
+        try:
+            client.send_request(URL, "get", deadline=time.monotonic() + 0.05)
+        except Acquire.DeadlineExceeded as err:
+            errors.append(err)
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    while not adapter.requests:
+        time.sleep(0.001)
+    follower = threading.Thread(
+        target=lambda: results.append(client.send_request(URL, "get").status_code)
+    )
+    follower.start()
+    follower.join(1)
+    time.sleep(0.06)
+    release.set()
+    thread.join(1)
+    assert results == [200]
+    assert len(errors) == 1
+
+
+@pytest.mark.parametrize("priority", ["background", "interactive"])
+def test_priorities_are_merged_separately(client, priority):
+    assert client.flight_key(URL, None, priority) != client.flight_key(
+        URL, None, "background" if priority == "interactive" else "interactive"
+    )
+    assert client.flight_key(URL, None, None) == client.flight_key(
+        URL, None, client.limiter.PRIORITY["default"]
+    )
@@ -0,0 +1,49 @@
+import pytest
+
+import src
+
+
+@pytest.fixture
+def identity(monkeypatch):
+    identity = src.app_identity
+    monkeypatch.setitem(identity.IDENTITY, "ttl", 600)
+    monkeypatch.setitem(identity.IDENTITY, "size", 3)
+    identity.reset()
+    yield identity
+    identity.reset()
+
+
+def test_merge_shares_one_object(identity):
+    first = identity.merge("user", {"id": 1, "nickname": "a"})
+    second = identity.merge("user", {"id": 1, "level": 2})
+    assert second is first
+    assert first == {"id": 1, "nickname": "a", "level": 2}
+    assert identity.stats()["merged"] == 1
+
+
+def test_load_reuses_projection_until_ttl(identity):
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {"id": 1, "nickname": f"n{len(calls)}"}
+
+    identity.load("user", 1, "detail", fetch)
+    assert identity.load("user", 1, "detail", fetch)["nickname"] == "n1"
+    assert len(calls) == 1
+    identity.IDENTITY["ttl"] = 0
+    assert identity.load("user", 1, "detail", fetch)["nickname"] == "n2"
+    assert len(calls) == 2
+
+
+def test_size_cap_evicts_least_recently_used(identity):
+    for id in range(3):
+        identity.store("work", id, "detail", {"id": id}, "id")
+    identity.get("work", 0)
+    identity.load("work", 0, "detail", lambda: pytest.fail("应直接返回"))
+    identity.merge("work", {"id": 3})
+    assert identity.get("work", 1) is None
+    assert identity.loaded("work", 1, "detail") is None
+    assert identity.get("work", 0) is not None
+    assert identity.stats()["entities"] == 3
+    assert identity.stats()["evicted"] == 1
@@ -0,0 +1,36 @@
+import asyncio
+
+import httpx
+
+import src
+from src.app import acquire as Acquire
+from src.app import codec as Codec
+
+URL = "/creation-tools/v1/works/1"
+TEMPLATE = "/creation-tools/v1/works/{id}"
+
+
+# 异步请求的耗时不含等待并发信号量的时间, 与同步请求一致
+def test_async_latency_excludes_semaphore_wait(client):
+    async def respond(request):
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, content=Codec.encode({"id": 1}))
+
+    async def fetch():
+        loop = asyncio.get_running_loop()
+        session = httpx.AsyncClient(transport=httpx.MockTransport(respond))
+        semaphore = asyncio.Semaphore(1)
+        Acquire.async_sessions[loop] = (session, semaphore)
+        try:
+            async with semaphore:
+                request = asyncio.ensure_future(
+                    src.app_acquire_async.send_request(url=URL, method="get")
+                )
+                await asyncio.sleep(0.3)
+            return await request
+        finally:
+            await session.aclose()
+
+    assert asyncio.run(fetch()).status_code == 200
+    latency = client.metrics.snapshot()[TEMPLATE]["latency"]["total"]
+    assert 0.01 <= latency < 0.2
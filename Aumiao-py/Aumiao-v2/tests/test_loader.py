@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.app import loader as Loader
+
+
+def test_batches_and_dispatches():
+    calls = []
+
+    def batch(keys):
+        calls.append(keys)
+        return {key: key * 10 for key in keys if key != 3}
+
+    loader = Loader.CodeMaoLoader(batch, window=10, size=2)
+    assert loader.get_many([1, 2, 1, 3]) == [10, 20, 10, None]
+    assert calls == [[1, 2], [3]]
+    assert loader.stats() == {"calls": 4, "batches": 2, "saved": 2}
+
+
+def test_error_reaches_every_caller_of_the_batch():
+    def batch(keys):
+        raise ValueError("批量请求失败")
+
+    loader = Loader.CodeMaoLoader(batch, window=10, size=2)
+    with pytest.raises(ValueError):
+        loader.get_many([1, 2])
+
+
+# 批量请求被中断时, 其他线程中等待的调用者也要收到异常, 而不是一直等待
+def test_interrupt_reaches_waiting_threads():
+    def batch(keys):
+        raise KeyboardInterrupt
+
+    loader = Loader.CodeMaoLoader(batch, window=10, size=2)
+    errors = []
+
+    def wait():
+        try:
+            loader.get(1)
+        except BaseException as err:
+            errors.append(err)
+
+    thread = threading.Thread(target=wait, daemon=True)
+    thread.start()
+    while not loader.pending:
+        pass
+    with pytest.raises(KeyboardInterrupt):
+        loader.get_many([2, 3])
+    thread.join(1)
+    assert not thread.is_alive()
+    assert isinstance(errors[0], KeyboardInterrupt)
+
+
+def test_cancelled_async_batch_cancels_callers():
+    async def main():
+        started = asyncio.Event()
+
+        async def batch_async(keys):
+            started.set()
+            await asyncio.Event().wait()
+
+        loader = Loader.CodeMaoLoader(lambda keys: {}, batch_async, window=0, size=1)
+        waiter = asyncio.ensure_future(loader.get_async(1))
+        await started.wait()
+        for task in asyncio.all_tasks():
+            if task is not asyncio.current_task() and task is not waiter:
+                task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(waiter, 1)
+
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+import asyncio
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import pytest
+from requests.exceptions import HTTPError
+
+import src
+from src.app import acquire as Acquire
+from src.app import codec as Codec
+
+URL = "/creation-tools/v1/works/1/comments"
+ITEMS = [{"id": index} for index in range(50)]
+
+
+def comments(failing_offset=None):
+    def handler(request):
+        query = parse_qs(urlsplit(str(request.url)).query)
+        limit, offset = int(query["limit"][0]), int(query["offset"][0])
+        if offset == failing_offset:
+            return 404, {"error_code": "Not-Found"}
+        return 200, {"items": ITEMS[offset : offset + limit], "total": len(ITEMS)}
+
+    return handler
+
+
+# 出错的一页不能被当作空页或最后一页
+@pytest.mark.parametrize("total_key", ["total", None])
+@pytest.mark.parametrize("failing_offset", [0, 20])
+def test_failed_page_raises(client, serve, total_key, failing_offset):
+    serve(comments(failing_offset))
+    with pytest.raises(HTTPError):
+        client.fetch_all_data(
+            URL, {"limit": 10, "offset": 0}, total_key=total_key, data_key="items"
+        )
+
+
+@pytest.mark.parametrize("total_key", ["total", None])
+def test_failed_page_raises_async(client, total_key):
+    handler = comments(20)
+
+    def respond(request):
+        status, body = handler(request)
+        return httpx.Response(status, content=Codec.encode(body))
+
+    async def fetch():
+        loop = asyncio.get_running_loop()
+        session = httpx.AsyncClient(transport=httpx.MockTransport(respond))
+        Acquire.async_sessions[loop] = (session, asyncio.Semaphore(4))
+        try:
+            return await src.app_acquire_async.fetch_all_data(
+                URL, {"limit": 10, "offset": 0}, total_key=total_key, data_key="items"
+            )
+        finally:
+            await session.aclose()
+
+    with pytest.raises(HTTPError):
+        asyncio.run(fetch())
@@ -0,0 +1,129 @@
+import asyncio
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+import pytest
+
+import src
+from src.app import acquire as Acquire
+from src.app import codec as Codec
+
+URL = "/creation-tools/v1/works/1/comments"
+TEMPLATE = "/creation-tools/v1/works/{id}/comments"
+ITEMS = [{"id": index} for index in range(130)]
+
+
+@pytest.fixture
+def page_size(client, monkeypatch, tmp_path):
+    page_size = client.page_size
+    monkeypatch.setitem(page_size.PAGE_SIZE, "enabled", True)
+    monkeypatch.setitem(page_size.PAGE_SIZE, "probe", 1000)
+    monkeypatch.setitem(page_size.PAGE_SIZE, "limits", {})
+    monkeypatch.setattr(page_size, "learned", {})
+    monkeypatch.setattr(page_size, "path", str(tmp_path / "page_limits.json"))
+    return page_size
+
+
+# 每页超过maximum时: rejecting为True返回400, 否则静默截断
+def comments(maximum: int, rejecting: bool):
+    def handler(request):
+        query = parse_qs(urlsplit(str(request.url)).query)
+        limit, offset = int(query["limit"][0]), int(query["offset"][0])
+        if limit > maximum and rejecting:
+            return 400, {"error_code": "Param-Invalid"}
+        items = ITEMS[offset : offset + min(limit, maximum)]
+        return 200, {"items": items, "total": len(ITEMS)}
+
+    return handler
+
+
+def limits(adapter):
+    return [
+        int(parse_qs(urlsplit(str(r.url)).query)["limit"][0]) for r in adapter.requests
+    ]
+
+
+@pytest.mark.parametrize("total_key", ["total", None])
+def test_rejected_probe_falls_back(client, page_size, serve, total_key):
+    adapter = serve(comments(50, rejecting=True))
+    result = client.fetch_all_data(
+        URL, {"limit": 20, "offset": 0}, total_key=total_key, data_key="items"
+    )
+    assert result == ITEMS
+    assert limits(adapter)[:2] == [1000, 20]
+    assert page_size.known(TEMPLATE) == 20
+    adapter.requests.clear()
+    client.fetch_all_data(
+        URL, {"limit": 20, "offset": 0}, total_key=total_key, data_key="items"
+    )
+    assert 1000 not in limits(adapter)
+
+
+@pytest.mark.parametrize("total_key", ["total", None])
+def test_rejected_known_limit_is_lowered(client, page_size, serve, total_key):
+    page_size.record(TEMPLATE, 100)
+    adapter = serve(comments(50, rejecting=True))
+    result = client.fetch_all_data(
+        URL, {"limit": 20, "offset": 0}, total_key=total_key, data_key="items"
+    )
+    assert result == ITEMS
+    assert limits(adapter)[:2] == [100, 20]
+    assert page_size.known(TEMPLATE) == 20
+
+
+def test_truncated_probe_records_limit(client, page_size, serve):
+    adapter = serve(comments(50, rejecting=False))
+    result = client.fetch_all_data(URL, {"limit": 20, "offset": 0}, data_key="items")
+    assert result == ITEMS
+    assert page_size.known(TEMPLATE) == 50
+    assert len(adapter.requests) == 3
+
+
+def test_learned_limits_stay_out_of_config(client, page_size, serve):
+    serve(comments(50, rejecting=False))
+    client.fetch_all_data(URL, {"limit": 20, "offset": 0}, data_key="items")
+    assert page_size.PAGE_SIZE["limits"] == {}
+    with open(page_size.path, "rb") as file:
+        assert Codec.decode(file.read()) == {TEMPLATE: 50}
+
+
+@pytest.mark.parametrize("total_key", ["total", None])
+def test_rejected_probe_falls_back_async(client, page_size, total_key):
+    handler = comments(50, rejecting=True)
+    sent = []
+
+    def respond(request):
+        sent.append(request)
+        status, body = handler(request)
+        return httpx.Response(status, content=Codec.encode(body))
+
+    async def fetch():
+        loop = asyncio.get_running_loop()
+        session = httpx.AsyncClient(transport=httpx.MockTransport(respond))
+        Acquire.async_sessions[loop] = (session, asyncio.Semaphore(4))
+        try:
+            return await src.app_acquire_async.fetch_all_data(
+                URL, {"limit": 20, "offset": 0}, total_key=total_key, data_key="items"
+            )
+        finally:
+            await session.aclose()
+
+    assert asyncio.run(fetch()) == ITEMS
+    assert [int(r.url.params["limit"]) for r in sent][:2] == [1000, 20]
+    assert page_size.known(TEMPLATE) == 20
+
+
+# 按page_bytes翻页时不提升每页数量, 也不能把自己的每页数量记为接口上限
+def test_page_bytes_does_not_record_limit(client, page_size, serve):
+    adapter = serve(comments(40, rejecting=False))
+    result = client.fetch_all_data(
+        URL,
+        {"limit": 10, "offset": 0},
+        total_key=None,
+        data_key="items",
+        page_bytes=100000,
+    )
+    assert result == ITEMS
+    assert set(limits(adapter)) == {10}
+    assert page_size.known(TEMPLATE) is None
+    assert page_size.probing(TEMPLATE)
@@ -0,0 +1,40 @@
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from requests.exceptions import HTTPError
+
+URL = "/creation-tools/v1/works/1/comments"
+ITEMS = [{"id": index} for index in range(25)]
+
+
+def comments(failing_offset=None):
+    def handler(request):
+        query = parse_qs(urlsplit(request.url).query)
+        limit, offset = int(query["limit"][0]), int(query["offset"][0])
+        if offset == failing_offset:
+            return 400, {"error_code": "Param-Invalid"}
+        return 200, {"items": ITEMS[offset : offset + limit], "total": len(ITEMS)}
+
+    return handler
+
+
+def test_stream_all_data(client, serve):
+    serve(comments())
+    result = list(
+        client.stream_all_data(
+            URL, {"limit": 10, "offset": 0}, data_key="items", chunk_size=7
+        )
+    )
+    assert result == ITEMS
+
+
+# 出错的一页不能被当作最后一页, 否则调用方拿到不完整的数据
+def test_stream_all_data_raises_on_failed_page(client, serve):
+    serve(comments(failing_offset=10))
+    received = []
+    with pytest.raises(HTTPError):
+        for item in client.stream_all_data(
+            URL, {"limit": 10, "offset": 0}, data_key="items"
+        ):
+            received.append(item)
+    assert received == ITEMS[:10]
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+
+import httpx
+
+import src
+from src.app import acquire as Acquire
+
+HOSTS = ["http://localhost", "http://127.0.0.1"]
+
+
+# 调用线程与fan_out线程池的每个线程都用自己的会话连接每个主机
+def test_warm_up_each_thread_session(client, serve):
+    threads = []
+
+    def handler(request):
+        threads.append((threading.current_thread().name, request.url))
+        return 200, {}
+
+    serve(handler)
+    timings = client.warm_up(HOSTS)
+    assert {host: timing["status"] for host, timing in timings.items()} == {
+        host: 200 for host in HOSTS
+    }
+    names = {name for name, _ in threads}
+    workers = client.data.PROGRAM_DATA["CONCURRENCY"]
+    assert threading.current_thread().name in names
+    assert len([name for name in names if name.startswith("fan-out")]) == workers
+    assert len(threads) == (workers + 1) * len(HOSTS)
+
+
+def test_warm_up_without_wait_leaves_caller_session(client, serve):
+    threads = []
+    done = threading.Event()
+    workers = client.data.PROGRAM_DATA["CONCURRENCY"]
+
+    def handler(request):
+        threads.append(threading.current_thread().name)
+        if len(threads) == workers * len(HOSTS):
+            done.set()
+        return 200, {}
+
+    serve(handler)
+    assert client.warm_up(HOSTS, wait=False) is None
+    assert done.wait(5)
+    assert threading.current_thread().name not in threads
+
+
+def test_warm_up_async_session(client):
+    sent = []
+
+    def respond(request):
+        sent.append((request.method, str(request.url)))
+        return httpx.Response(200)
+
+    async def warm():
+        loop = asyncio.get_running_loop()
+        session = httpx.AsyncClient(transport=httpx.MockTransport(respond))
+        Acquire.async_sessions[loop] = (session, asyncio.Semaphore(4))
+        try:
+            return await src.app_acquire_async.warm_up(HOSTS)
+        finally:
+            await session.aclose()
+
+    timings = asyncio.run(warm())
+    assert {host: timing["status"] for host, timing in timings.items()} == {
+        host: 200 for host in HOSTS
+    }
+    assert sorted(sent) == [("HEAD", host) for host in sorted(HOSTS)]